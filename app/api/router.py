@@ -1,63 +1,247 @@
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException
-from fastapi.responses import HTMLResponse
+import asyncio
+import secrets
+import time
+from typing import Optional
+
+from fastapi import APIRouter, UploadFile, File, Form, Header, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import HTMLResponse, FileResponse, PlainTextResponse, Response
 from pathlib import Path
+from starlette.concurrency import run_in_threadpool
 
-from app.schemas.analysis import Category, VibeResponse
-from app.services.vision_service import analyze_image_with_smart_ai
-from app.services.llm_services import get_recommendations_from_gemini
+from app.schemas.analysis import Category, VibeResponse, JobStatus
+from app.services.analysis_pipeline import run_analysis
+from app.services.job_queue import check_callback_url, job_queue, job_workers
+from app.services.search_service import get_provider_health
+from app.services.degradation import degradation
+from app.services.poster_cache import poster_cache, CACHE_CONTROL, DEFAULT_WIDTH
+from app.services.live_service import LiveSession, live_worker
+from app.services import profiler
+from app.core.config import settings
+from app.utils.upload import read_upload_bounded
+from app.utils.static_page import StaticPage
+from app.utils.json_response import model_response
 
 ROOT_DIR = Path(__file__).parent.parent.parent
 STATUS_HTML_FILE_PATH = ROOT_DIR / "static/index.html"
+status_page = StaticPage(STATUS_HTML_FILE_PATH)
 
 # Initialize the API Router
 router = APIRouter()
 
 @router.get("/")
-async def root_status():
+async def root_status(
+        accept_encoding: str = Header(""),
+        if_none_match: Optional[str] = Header(None)
+):
     """
-    Reads the index.html file content and serves it as HTMLResponse.
+    Serves static/index.html from memory (reloaded when the file changes), precompressed,
+    with an ETag so repeat visits get a 304.
     """
     try:
-        # Reads the content of the index.html file and returns it.
-        html_content = STATUS_HTML_FILE_PATH.read_text(encoding="utf-8")
-        return HTMLResponse(content=html_content, status_code=200)
+        return status_page.response(accept_encoding, if_none_match)
     except FileNotFoundError:
         # Returns a simple HTML error message if the file is not found.
         # This helps check the file path during development.
         return HTMLResponse(
-            content="<h1>Server is running, but index.html was not found.</h1><p>Check the path: " + str(HTML_FILE_PATH) + "</p>",
+            content="<h1>Server is running, but index.html was not found.</h1><p>Check the path: " + str(STATUS_HTML_FILE_PATH) + "</p>",
             status_code=500
         )
 
+@router.get("/health/providers")
+async def provider_health():
+    """
+    Returns circuit breaker state and EWMA latency/success stats for each metadata provider.
+    """
+    return get_provider_health()
+
+@router.get("/health/degradation")
+async def degradation_status():
+    """
+    Returns the current degradation level, the load signals behind it and the end-to-end latency EWMA.
+    """
+    return degradation.snapshot()
+
+@router.get("/posters/{key}")
+async def poster(key: str, w: int = DEFAULT_WIDTH):
+    """
+    Serves a recommendation poster as a resized WebP (w: 185, 342 or 500; the nearest size is used).
+    The upstream image is fetched once and kept in the on-disk LRU cache.
+    """
+    if not poster_cache.is_valid_key(key):
+        raise HTTPException(status_code=404, detail="Poster not found.")
+    try:
+        path = await run_in_threadpool(poster_cache.get_variant, key, w)
+    except Exception as e:
+        print(f"⚠️ Poster proxy error for {key}: {e}")
+        raise HTTPException(status_code=502, detail="Poster could not be fetched.")
+    if path is None:
+        raise HTTPException(status_code=404, detail="Poster not found.")
+    return FileResponse(path, media_type="image/webp", headers={"Cache-Control": CACHE_CONTROL})
+
 @router.post("/analyze", response_model=VibeResponse)
 async def analyze(
         category: Category = Form(...),
         file: UploadFile = File(...)
 ):
-    # 1. Process the Image and Extract User Context (Emotion, Age, Gender)
-    image_bytes = await file.read()
-    user_context = analyze_image_with_smart_ai(image_bytes)
-
-    if not user_context:
-        # If the vision pipeline fails to detect a face or extract data
-        raise HTTPException(status_code=400, detail="Face could not be detected or analyzed.")
-
-    # 2. Get Recommendations from the LLM (Gemini)
-    recommendation_data = get_recommendations_from_gemini(user_context, category)
-
-    if not recommendation_data:
-        # If the LLM service or its retry mechanism fails
-        raise HTTPException(status_code=500, detail="AI service failed to return a response.")
-
-    # 3. Construct and Return the Final Response
-    # Merge the user context (from Vision) with the recommendations (from LLM)
-    return VibeResponse(
-        mood_title=recommendation_data['mood_title'],
-        mood_description=recommendation_data['mood_description'],
-        recommendations=recommendation_data['recommendations'],
-        dominant_emotion=user_context['emotion'],
-        secondary_emotion=user_context['secondary_emotion'],
-        detected_age=user_context['age'],
-        detected_gender=user_context['gender'],
-        emotion_scores=user_context['raw_emotion_scores']
-    )
\ No newline at end of file
+    # The upload is size-checked and sniffed while reading, then decoded from a memoryview (no extra copies)
+    upload_view, upload_kind = await read_upload_bounded(file, settings.MAX_UPLOAD_BYTES)
+    # Vision -> Gemini -> metadata enrichment (see app/services/analysis_pipeline.py). It blocks for
+    # seconds, so it runs in the threadpool and the event loop keeps serving /ws/live and other requests.
+    # Counted as load from here: requests still waiting for a thread raise the degradation pressure too
+    with degradation.admit():
+        response = await run_in_threadpool(
+            run_analysis, upload_view, upload_kind, category, "analyze", time.perf_counter()
+        )
+    return model_response(response)
+
+@router.post("/jobs", response_model=JobStatus, status_code=202)
+async def create_job(
+        category: Category = Form(...),
+        file: UploadFile = File(...),
+        callback_url: Optional[str] = Form(None)
+):
+    """
+    Queues an analysis and returns immediately. Poll GET /jobs/{job_id}; if callback_url is given,
+    the final job status is also POSTed there as JSON.
+    """
+    if callback_url:
+        rejected = await run_in_threadpool(check_callback_url, callback_url)  # Resolves the host
+        if rejected:
+            raise HTTPException(status_code=400, detail=rejected)
+
+    upload_view, upload_kind = await read_upload_bounded(file, settings.MAX_UPLOAD_BYTES)
+    job_id = await run_in_threadpool(job_queue.enqueue, upload_view, upload_kind, category, callback_url)
+    job_workers.notify()
+    return model_response(JobStatus(**await run_in_threadpool(job_queue.get, job_id)), status_code=202)
+
+@router.get("/jobs/{job_id}", response_model=JobStatus)
+async def get_job(job_id: str):
+    """
+    Returns the job's status, and the analysis result once it is done.
+    """
+    job = await run_in_threadpool(job_queue.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return model_response(JobStatus(**job))
+
+@router.websocket("/ws/live")
+async def live_stream(websocket: WebSocket):
+    """
+    Real-time emotion stream. The client sends JPEG frames as binary messages; the server
+    analyses the latest frame only (stale frames are dropped when inference lags) and pushes
+    smoothed dominant/secondary emotion, scores and the face box at up to LIVE_TARGET_FPS.
+    """
+    await websocket.accept()
+    session = LiveSession(asyncio.get_running_loop())
+    min_interval = 1.0 / settings.LIVE_TARGET_FPS
+
+    async def push_results():
+        while True:
+            await session.result_ready.wait()
+            session.result_ready.clear()
+            await websocket.send_json(session.result)
+            # Cap the push rate; anything produced meanwhile is coalesced into the next message
+            await asyncio.sleep(min_interval)
+
+    async def receive_frames():
+        try:
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    return
+                frame = message.get("bytes")
+                if not frame or len(frame) > settings.LIVE_MAX_FRAME_BYTES:
+                    continue
+                live_worker.submit(session, frame)
+        except WebSocketDisconnect:
+            pass
+
+    sender = asyncio.create_task(push_results())
+    receiver = asyncio.create_task(receive_frames())
+    try:
+        # Whichever side stops first ends the session: a client disconnect, or a failed send
+        # (no more frames are fed to the live worker for a client that no longer gets results)
+        done, _ = await asyncio.wait((sender, receiver), return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            error = task.exception()
+            if error is not None:
+                print(f"⚠️ Live stream closed after an error: {error!r}")
+                try:
+                    await websocket.close(code=1011)
+                except Exception:
+                    pass  # The connection is already gone
+    finally:
+        session.closed = True
+        sender.cancel()
+        receiver.cancel()
+
+# --- ADMIN: ON-DEMAND PROFILING ---
+def _require_admin(token: Optional[str]):
+    # Admin endpoints do not exist unless ADMIN_TOKEN is configured
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not token or not secrets.compare_digest(token, settings.ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token.")
+
+@router.post("/admin/profile")
+async def start_profiling(
+        requests: Optional[int] = None,
+        seconds: float = 60.0,
+        torch: bool = False,
+        x_admin_token: Optional[str] = Header(None)
+):
+    """
+    Profiles the next `requests` analyses (or everything for `seconds`, whichever ends first):
+    stack samples + cProfile for Python code and, with torch=true, torch.profiler for HSEmotion.
+    """
+    _require_admin(x_admin_token)
+    try:
+        session = profiler.start_session(requests, seconds, torch)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return session.summary()
+
+@router.get("/admin/profile")
+async def profiling_status(x_admin_token: Optional[str] = Header(None)):
+    _require_admin(x_admin_token)
+    session = profiler.current_session()
+    return session.summary() if session else {"active": False}
+
+@router.delete("/admin/profile")
+async def stop_profiling(x_admin_token: Optional[str] = Header(None)):
+    _require_admin(x_admin_token)
+    session = profiler.current_session()
+    if session is None:
+        raise HTTPException(status_code=404, detail="No profiling session.")
+    session.stop()
+    return session.summary()
+
+@router.get("/admin/profile/result")
+async def profiling_result(format: str = "collapsed", x_admin_token: Optional[str] = Header(None)):
+    """
+    Downloads the last session's results:
+    collapsed (Python stack samples, for flamegraph.pl / speedscope), torch (HSEmotion operator stacks,
+    same format), pstats (binary cProfile dump for snakeviz / pstats) or text (top cProfile entries).
+    """
+    _require_admin(x_admin_token)
+    session = profiler.current_session()
+    if session is None:
+        raise HTTPException(status_code=404, detail="No profiling session.")
+
+    if format in ("collapsed", "torch"):
+        return PlainTextResponse(
+            session.collapsed(torch=format == "torch"),
+            headers={"Content-Disposition": f'attachment; filename="profile-{format}.folded"'}
+        )
+    if format == "pstats":
+        data = await run_in_threadpool(session.pstats_dump)
+        if data is None:
+            raise HTTPException(status_code=404, detail="No request has been profiled yet.")
+        return Response(
+            data,
+            media_type="application/octet-stream",
+            headers={"Content-Disposition": 'attachment; filename="profile.prof"'}
+        )
+    if format == "text":
+        return PlainTextResponse(session.pstats_text())
+    raise HTTPException(status_code=400, detail="format must be collapsed, torch, pstats or text.")
@@ -1,4 +1,5 @@
 import os
+import sys
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -6,5 +7,162 @@ load_dotenv()
 class Settings:
     TMDB_API_KEY = os.getenv("TMDB_API_KEY")
     GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+    GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-flash-latest")
 
-settings = Settings()
\ No newline at end of file
+    # --- Metadata Enrichment Scheduler ---
+    # Process-wide worker threads shared by all requests (global cap on concurrent enrichment work)
+    ENRICHMENT_WORKERS = int(os.getenv("ENRICHMENT_WORKERS", "16"))
+    # Max simultaneous outbound calls to any single provider (TMDB, iTunes, ...)
+    PROVIDER_MAX_CONCURRENCY = int(os.getenv("PROVIDER_MAX_CONCURRENCY", "6"))
+    # Seconds a request waits for enrichment before unfinished items fall back to Gemini's values
+    ENRICHMENT_DEADLINE = float(os.getenv("ENRICHMENT_DEADLINE", "8.0"))
+
+    # --- Vision Profile ---
+    # 'full': DeepFace (RetinaFace + TensorFlow age/gender). 'slim': OpenCV DNN models, no TensorFlow.
+    VISION_PROFILE = os.getenv("VISION_PROFILE", "full").lower()
+    SLIM_MODELS_DIR = os.getenv("SLIM_MODELS_DIR", "models/slim")
+    # Load and warm up the vision models in the lifespan hook (off: on the first request instead)
+    WARM_UP_ON_STARTUP = os.getenv("WARM_UP_ON_STARTUP", "1") == "1"
+
+    # --- Upload Ingestion ---
+    MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(20 * 1024 * 1024)))  # Applies to images and clips
+
+    # --- Live WebSocket Stream (/ws/live) ---
+    LIVE_INFERENCE_WORKERS = int(os.getenv("LIVE_INFERENCE_WORKERS", "1"))  # Persistent inference threads
+    LIVE_TARGET_FPS = float(os.getenv("LIVE_TARGET_FPS", "10"))  # Max results pushed per second per session
+    LIVE_SMOOTHING_ALPHA = float(os.getenv("LIVE_SMOOTHING_ALPHA", "0.4"))  # EMA weight of the newest frame
+    LIVE_MAX_FRAME_BYTES = int(os.getenv("LIVE_MAX_FRAME_BYTES", str(512 * 1024)))
+
+    # --- Metadata Cache & Warmer ---
+    METADATA_CACHE_TTL_MINUTES = int(os.getenv("METADATA_CACHE_TTL_MINUTES", "360"))
+    METADATA_CACHE_MAX_ENTRIES = int(os.getenv("METADATA_CACHE_MAX_ENTRIES", "5000"))
+    # Append-only JSONL log of every Gemini answer (category, emotions, recommended titles)
+    RECOMMENDATION_LOG_PATH = os.getenv("RECOMMENDATION_LOG_PATH", "data/recommendation_history.jsonl")
+    CACHE_WARMER_ENABLED = os.getenv("CACHE_WARMER_ENABLED", "1") == "1"
+    CACHE_WARMER_INTERVAL = float(os.getenv("CACHE_WARMER_INTERVAL", "300"))  # Seconds between warming passes
+    CACHE_WARMER_TOP_N = int(os.getenv("CACHE_WARMER_TOP_N", "50"))  # Most frequent titles kept warm
+    CACHE_WARMER_RATE_PER_MIN = float(os.getenv("CACHE_WARMER_RATE_PER_MIN", "20"))  # Max titles re-resolved per minute, all processes
+    CACHE_WARMER_PROCESSES = int(os.getenv("CACHE_WARMER_PROCESSES", "1"))  # Processes sharing that rate (gunicorn.conf.py sets it)
+    CACHE_WARMER_LOOKBACK_DAYS = float(os.getenv("CACHE_WARMER_LOOKBACK_DAYS", "7"))
+
+    # --- Poster Proxy (/posters/{key}) ---
+    # Absolute base of the links handed to clients, e.g. https://api.example.com
+    POSTER_PUBLIC_BASE_URL = os.getenv("POSTER_PUBLIC_BASE_URL", "").rstrip("/")
+    # Off: responses keep the upstream URLs. On by default only once the base URL is configured
+    # (forcing it on without one yields relative /posters/... links)
+    POSTER_PROXY_ENABLED = os.getenv("POSTER_PROXY_ENABLED", "1" if POSTER_PUBLIC_BASE_URL else "0") == "1"
+    POSTER_CACHE_DIR = os.getenv("POSTER_CACHE_DIR", "data/posters")
+    POSTER_CACHE_MAX_MB = int(os.getenv("POSTER_CACHE_MAX_MB", "512"))  # LRU eviction above this size
+
+    # --- Degradation Ladder (see app/services/degradation.py) ---
+    DEGRADATION_ENABLED = os.getenv("DEGRADATION_ENABLED", "1") == "1"
+    DEGRADE_MAX_INFLIGHT = int(os.getenv("DEGRADE_MAX_INFLIGHT", "8"))  # Analyses running or waiting for a thread at full load
+    DEGRADE_MAX_QUEUED_JOBS = int(os.getenv("DEGRADE_MAX_QUEUED_JOBS", "16"))  # Queued /jobs that count as full load
+    DEGRADE_TARGET_LATENCY = float(os.getenv("DEGRADE_TARGET_LATENCY", "10.0"))  # End-to-end EWMA seconds
+    DEGRADE_COOLDOWN = float(os.getenv("DEGRADE_COOLDOWN", "5.0"))  # Min seconds between level changes
+    DEGRADE_MAX_LEVEL = int(os.getenv("DEGRADE_MAX_LEVEL", "5"))  # 5 = may serve cached recommendations
+
+    # --- Response Compression (br needs the optional 'brotli' package) ---
+    COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "500"))  # Smaller responses are sent as-is
+    GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+    BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "5"))  # 0-11; higher levels cost far more CPU per response
+
+    # --- Request Event Log (see scripts/request_log_report.py) ---
+    REQUEST_LOG_ENABLED = os.getenv("REQUEST_LOG_ENABLED", "1") == "1"
+    REQUEST_LOG_DIR = os.getenv("REQUEST_LOG_DIR", "data/request_log")
+    REQUEST_LOG_MAX_MB = float(os.getenv("REQUEST_LOG_MAX_MB", "20"))  # Active file is gzip-rotated above this size
+    REQUEST_LOG_MAX_FILES = int(os.getenv("REQUEST_LOG_MAX_FILES", "100"))  # Compressed archives kept (oldest deleted)
+
+    # --- Admin / Profiling (/admin/profile) ---
+    ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")  # Sent as X-Admin-Token; admin endpoints are disabled when unset
+    PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "5"))
+    PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "300"))  # Upper bound on any profiling window
+
+    # --- Asynchronous Jobs (/jobs) ---
+    JOB_DB_PATH = os.getenv("JOB_DB_PATH", "data/jobs.sqlite3")  # SQLite queue shared by API and job workers
+    JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))  # Job threads per API process (0: run scripts/run_job_workers.py)
+    JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1.0"))  # Seconds between queue polls when idle
+    JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))  # Runs of a job whose worker died before giving up
+    JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "300"))  # A running job older than this is re-queued
+    JOB_RETENTION_HOURS = float(os.getenv("JOB_RETENTION_HOURS", "24"))  # Finished jobs are purged after this
+    # Hosts callback_url may point to (comma-separated). Empty: any host that resolves only to public addresses
+    CALLBACK_ALLOWED_HOSTS = [h.strip().lower() for h in os.getenv("CALLBACK_ALLOWED_HOSTS", "").split(",") if h.strip()]
+
+    # --- CPU Thread Budget (see apply_thread_budget) ---
+    # Cores this process may use; gunicorn.conf.py sets it to each worker's share
+    CPU_CORES = int(os.getenv("CPU_CORES", str(os.cpu_count() or 1)))
+    # Per-runtime thread counts; 0 derives them from CPU_CORES
+    TORCH_THREADS = int(os.getenv("TORCH_THREADS", "0"))
+    TORCH_INTEROP_THREADS = int(os.getenv("TORCH_INTEROP_THREADS", "1"))
+    TF_INTRA_THREADS = int(os.getenv("TF_INTRA_THREADS", "0"))
+    TF_INTER_THREADS = int(os.getenv("TF_INTER_THREADS", "1"))
+    OPENCV_THREADS = int(os.getenv("OPENCV_THREADS", "0"))
+
+settings = Settings()
+
+
+# --- CPU THREAD BUDGET ---
+# Left alone, torch, TensorFlow and OpenCV each size their pools to every core, so concurrent
+# requests oversubscribe the CPU. HSEmotion (torch) runs on every request and gets half of the cores;
+# TensorFlow (demography, once per request) and OpenCV (decode/resize/detect) share the rest.
+# The enrichment and live pools are I/O-bound or serialised and are sized separately.
+def thread_budget(cores: int | None = None) -> dict:
+    """Returns the thread count per runtime for the given core count (default: CPU_CORES)."""
+    cores = max(1, cores or settings.CPU_CORES)
+    return {
+        "cores": cores,
+        "torch": settings.TORCH_THREADS or max(1, cores // 2),
+        "torch_interop": settings.TORCH_INTEROP_THREADS,
+        "tf_intra": settings.TF_INTRA_THREADS or max(1, cores // 4),
+        "tf_inter": settings.TF_INTER_THREADS,
+        "opencv": settings.OPENCV_THREADS or max(1, cores // 4),
+        "enrichment": settings.ENRICHMENT_WORKERS,
+        "live": settings.LIVE_INFERENCE_WORKERS,
+    }
+
+
+_applied_budget: tuple[int, dict] | None = None  # (pid, budget) of the last apply in this process
+
+
+def apply_thread_budget(cores: int | None = None) -> dict:
+    """
+    Applies the thread budget to every runtime. Call at startup, before the models load:
+    torch and TensorFlow read the environment variables when they are imported, and a runtime
+    that is already loaded is reconfigured directly where it allows it.
+    """
+    global _applied_budget
+    budget = thread_budget(cores)
+    if _applied_budget == (os.getpid(), budget):
+        return budget
+
+    os.environ["OMP_NUM_THREADS"] = str(budget["torch"])
+    os.environ["MKL_NUM_THREADS"] = str(budget["torch"])
+    os.environ["TF_NUM_INTRAOP_THREADS"] = str(budget["tf_intra"])
+    os.environ["TF_NUM_INTEROP_THREADS"] = str(budget["tf_inter"])
+
+    import cv2
+    cv2.setNumThreads(budget["opencv"])
+
+    torch = sys.modules.get("torch")
+    if torch is not None:
+        torch.set_num_threads(budget["torch"])
+        try:
+            torch.set_num_interop_threads(budget["torch_interop"])
+        except RuntimeError:
+            pass  # Only settable once, before the first parallel op
+
+    tf = sys.modules.get("tensorflow")
+    if tf is not None:
+        try:
+            tf.config.threading.set_intra_op_parallelism_threads(budget["tf_intra"])
+            tf.config.threading.set_inter_op_parallelism_threads(budget["tf_inter"])
+        except RuntimeError:
+            pass  # Fixed once TensorFlow has initialised; the environment variables applied instead
+
+    print(
+        f" Thread budget ({budget['cores']} cores): torch={budget['torch']}+{budget['torch_interop']} interop, "
+        f"tf={budget['tf_intra']}/{budget['tf_inter']}, opencv={budget['opencv']}, "
+        f"enrichment={budget['enrichment']} (I/O), live={budget['live']}"
+    )
+    _applied_budget = (os.getpid(), budget)
+    return budget
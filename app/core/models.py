@@ -1,7 +1,6 @@
 import os
 import ssl
-import torch
-from hsemotion.facial_emotions import HSEmotionRecognizer
+import threading
 from typing import Dict
 
 # --- 1. SECURITY AND COMPATIBILITY FIXES ---
@@ -16,12 +15,17 @@ except AttributeError:
 else:
     ssl._create_default_https_context = _create_unverified_https_context
 
-# PyTorch Compatibility Fix: Forces weights_only=False for loading older models securely
-_original_torch_load = torch.load
-def _unsafe_torch_load(*args, **kwargs):
-    kwargs['weights_only'] = False
-    return _original_torch_load(*args, **kwargs)
-torch.load = _unsafe_torch_load
+# PyTorch Compatibility Fix: Forces weights_only=False for loading older models securely.
+# Applied when the model is first loaded (see get_emotion_recognizer) so importing this module stays cheap.
+def _patch_torch_load(torch):
+    if getattr(torch.load, "_vibelens_patched", False):
+        return
+    _original_torch_load = torch.load
+    def _unsafe_torch_load(*args, **kwargs):
+        kwargs['weights_only'] = False
+        return _original_torch_load(*args, **kwargs)
+    _unsafe_torch_load._vibelens_patched = True
+    torch.load = _unsafe_torch_load
 
 # --- 2. CONFIGURATION & CONSTANTS ---
 
@@ -37,13 +41,63 @@ EMOTION_CLASSES: Dict[int, str] = {
     4: 'Happiness', 5: 'Neutral', 6: 'Sadness', 7: 'Surprise'
 }
 
-# --- 3. MODEL INITIALIZATION ---
-print(" Preparing Vision Models...")
-try:
-    DEVICE = 'mps' if torch.backends.mps.is_available() else 'cpu'
-    # The emotion_recognizer object will be imported by service files
-    emotion_recognizer = HSEmotionRecognizer(model_name='enet_b0_8_best_vgaf', device=DEVICE)
-    print(f" HSEmotion Ready! ({DEVICE})")
-except Exception as e:
-    print(f" HSEmotion Error: {e}")
-    emotion_recognizer = None
\ No newline at end of file
+# --- 3. MODEL INITIALIZATION (lazy) ---
+# torch/hsemotion are imported on first use (or by the lifespan warm-up), not when the app is imported
+_emotion_recognizer = None
+_emotion_recognizer_loaded = False
+_emotion_recognizer_lock = threading.Lock()
+
+
+def get_emotion_recognizer():
+    """Returns the shared HSEmotionRecognizer, loading it on first call (None if loading failed)."""
+    global _emotion_recognizer, _emotion_recognizer_loaded
+    if _emotion_recognizer_loaded:
+        return _emotion_recognizer
+
+    with _emotion_recognizer_lock:
+        if not _emotion_recognizer_loaded:
+            print(" Preparing Vision Models...")
+            try:
+                import torch
+                from hsemotion.facial_emotions import HSEmotionRecognizer
+
+                _patch_torch_load(torch)
+                device = 'mps' if torch.backends.mps.is_available() else 'cpu'
+                _emotion_recognizer = HSEmotionRecognizer(model_name='enet_b0_8_best_vgaf', device=device)
+                print(f" HSEmotion Ready! ({device})")
+            except Exception as e:
+                print(f" HSEmotion Error: {e}")
+                _emotion_recognizer = None
+            _emotion_recognizer_loaded = True
+    return _emotion_recognizer
+
+
+# --- 4. PRELOAD / WARM-UP (multi-worker launch, see gunicorn.conf.py) ---
+def preload_model_weights(before_fork: bool = False):
+    """
+    Loads every model's weights without running inference.
+    With before_fork=True (gunicorn master) only fork-safe weights are loaded: the HSEmotion torch
+    weights and, in the slim profile, the OpenCV nets. DeepFace/TensorFlow models start runtime
+    thread pools that do not survive fork(), so each worker loads those itself (post_worker_init).
+    """
+    from app.services import face_backend
+
+    get_emotion_recognizer()
+    if before_fork and not face_backend.preload_is_fork_safe():
+        print(f" Face models ({face_backend.PROFILE} profile) are not fork-safe; each worker loads its own.")
+        return
+    print(f" Preloading face detection / demography models ({face_backend.PROFILE} profile)...")
+    face_backend.preload()
+    print(" Face models preloaded.")
+
+
+def warm_up_inference():
+    """Runs one tiny inference per model so the first real request does not pay for lazy initialisation."""
+    import numpy as np
+    from app.services.face_backend import analyze_demography
+
+    dummy = np.zeros((224, 224, 3), dtype=np.uint8)
+    recognizer = get_emotion_recognizer()
+    if recognizer is not None:
+        recognizer.predict_emotions(dummy, logits=False)
+    analyze_demography(dummy)
@@ -3,25 +3,43 @@ import random
 
 from app.schemas.analysis import Category
 
-def build_gemini_prompt(category: Category, age: int, gender: str, emotion: str, secondary_emotion: str, raw_scores: dict) -> str:
-    """
-        Constructs a detailed JSON-output prompt for the Gemini model based on user's emotional context.
-        The prompt sets a persona, defines strict content rules (anti-cliché), and forces a JSON output.
-    """
-    scores_str = json.dumps(raw_scores)
+def _build_category_instruction(category: Category) -> str:
+    """Returns the static field-filling rules for a category."""
+    if category in [Category.MOVIE, Category.SERIES]:
+        return """
+            KATEGORİ: FILM/DIZI
+            -------------------
+            1. 'title': Orijinal film/dizi adını yaz.
+            2. 'creator': Yönetmen adını yaz.
+            3. 'overview': Film/dizinin konusunu akıcı Türkçe ile özetle (2-3 cümle). Asla yarım bırakma.
+            4. 'rating': Kendi bilgi tabanına dayanarak 10 üzerinden bir puan ver (Örn: "8.5/10"). "Null" bırakma.
+            5. 'year': Film/dizinin çıkış yılını yaz.
+            6. 'poster_url': Bunu BOŞ BIRAK (""). (Bunu biz bulacağız, sen metne odaklan).
+            
+            NOT: 'rating', 'overview' ve 'year' için verdiğin değerler yedek olarak kalacak. 
+            Eğer veritabanından daha güncel veri bulursak, seninkilerin üzerine yazılacak.
+            """
+    return """
+            KATEGORİ: KITAP/MUZIK
+            ---------------------
+            1. 'overview': Eserin konusunu/temasını akıcı bir Türkçe ile özetle (2-3 cümle). Asla yarım bırakma.
+            2. 'rating': Kendi bilgi tabanına dayanarak 10 üzerinden bir puan ver (Örn: "8.5/10"). "Null" bırakma.
+            3. 'year': Eserin çıkış yılını yaz.
+            4. 'poster_url': Bunu BOŞ BIRAK (""). (Bunu biz bulacağız, sen metne odaklan).
+            """
 
-    # RANDOM SEED: A random number is injected to prevent the model from returning cached responses.
-    random_seed = random.randint(1, 10000)
 
-    # 1. PERSONA AND INPUT CONTEXT
+def build_system_instruction(category: Category) -> str:
+    """
+        Constructs the static system instruction for a category: persona, anti-cliché and tone rules,
+        category-specific field rules and the JSON output template.
+        Nothing user-specific goes in here, so the text is identical across requests and can be cached.
+    """
+    # 1. PERSONA AND TASK
     base_prompt = f"""
-    Sen VibeLens, sinema, edebiyat ve müzik dünyasının kıyıda köşede kalmış hazinelerini de bilen, 'mainstream' (popüler) kültürün ötesine geçebilen zeki bir küratörsün. (Random Seed: {random_seed})
+    Sen VibeLens, sinema, edebiyat ve müzik dünyasının kıyıda köşede kalmış hazinelerini de bilen, 'mainstream' (popüler) kültürün ötesine geçebilen zeki bir küratörsün.
 
-    KULLANICI: {age} yaşında, {gender}.
-    
-    KULLANICI: {age} yaşında, {gender}.
-    DUYGU RAPORU: Baskın: {emotion}, Alt Ton: {secondary_emotion}
-    DETAYLAR: {scores_str}
+    Her mesajda sana bir kullanıcının yaşı, cinsiyeti ve DUYGU RAPORU (Baskın duygu, Alt Ton ve detaylı skorlar) verilecek.
 
     GÖREVİN:
     Bu kullanıcının KARMAŞIK ruh haline en uygun **KESİNLİKLE 3 ADET** '{category.value}' önerilerini yap.
@@ -40,7 +58,7 @@ def build_gemini_prompt(category: Category, age: int, gender: str, emotion: str,
     5. Hitap şeklin direkt 'Sen' olsun.
     
     ⚠️ ANALİZ TALİMATI (Bunu Uygula):
-    Sadece baskın duyguya ({emotion}) odaklanma! İkincil duygu ({secondary_emotion}) işin rengini değiştirir.
+    Sadece baskın duyguya odaklanma! İkincil duygu (Alt Ton) işin rengini değiştirir.
     
     Örnekler:
     - Sadece 'Sadness' = Melankoli.
@@ -56,29 +74,7 @@ def build_gemini_prompt(category: Category, age: int, gender: str, emotion: str,
     """
 
     # 2. CATEGORY-SPECIFIC INSTRUCTIONS
-    if category in [Category.MOVIE, Category.SERIES]:
-        instruction = """
-            KATEGORİ: FILM/DIZI
-            -------------------
-            1. 'title': Orijinal film/dizi adını yaz.
-            2. 'creator': Yönetmen adını yaz.
-            3. 'overview': Film/dizinin konusunu akıcı Türkçe ile özetle (2-3 cümle). Asla yarım bırakma.
-            4. 'rating': Kendi bilgi tabanına dayanarak 10 üzerinden bir puan ver (Örn: "8.5/10"). "Null" bırakma.
-            5. 'year': Film/dizinin çıkış yılını yaz.
-            6. 'poster_url': Bunu BOŞ BIRAK (""). (Bunu biz bulacağız, sen metne odaklan).
-            
-            NOT: 'rating', 'overview' ve 'year' için verdiğin değerler yedek olarak kalacak. 
-            Eğer veritabanından daha güncel veri bulursak, seninkilerin üzerine yazılacak.
-            """
-    else:
-        instruction = """
-            KATEGORİ: KITAP/MUZIK
-            ---------------------
-            1. 'overview': Eserin konusunu/temasını akıcı bir Türkçe ile özetle (2-3 cümle). Asla yarım bırakma.
-            2. 'rating': Kendi bilgi tabanına dayanarak 10 üzerinden bir puan ver (Örn: "8.5/10"). "Null" bırakma.
-            3. 'year': Eserin çıkış yılını yaz.
-            4. 'poster_url': Bunu BOŞ BIRAK (""). (Bunu biz bulacağız, sen metne odaklan).
-            """
+    instruction = _build_category_instruction(category)
 
     # 3. OUTPUT FORMAT AND TECHNICAL RULES
     output_format = """
@@ -105,7 +101,27 @@ def build_gemini_prompt(category: Category, age: int, gender: str, emotion: str,
     }
     """
 
-    # NOTE: Added dominant_emotion, secondary_emotion, detected_age, detected_gender, and emotion_scores
-    # to the JSON template to match the VibeResponse schema, ensuring the model returns all required fields.
+    return base_prompt + instruction + output_format
+
+
+# Precompiled once per category; these never change at runtime
+SYSTEM_INSTRUCTIONS: dict[Category, str] = {category: build_system_instruction(category) for category in Category}
+
+
+def build_gemini_prompt(category: Category, age: int | None, gender: str, emotion: str, secondary_emotion: str, raw_scores: dict) -> str:
+    """
+        Constructs the small per-request user message (demography + emotion report).
+        The persona, rules and JSON template live in SYSTEM_INSTRUCTIONS[category].
+    """
+    scores_str = json.dumps(raw_scores)
+
+    # RANDOM SEED: A random number is injected to prevent the model from returning cached responses.
+    random_seed = random.randint(1, 10000)
+
+    # Demography is skipped under heavy load (see app/services/degradation.py)
+    user_line = f"{age} yaşında, {gender}." if age is not None else "Yaş ve cinsiyet bilinmiyor."
 
-    return base_prompt + instruction + output_format
\ No newline at end of file
+    return f"""KULLANICI: {user_line}
+DUYGU RAPORU: Baskın: {emotion}, Alt Ton: {secondary_emotion}
+DETAYLAR: {scores_str}
+Bu kullanıcı için 3 adet '{category.value}' önerisi yap. (Random Seed: {random_seed})"""
@@ -30,7 +30,20 @@ class VibeResponse(BaseModel):
     mood_description: str
     dominant_emotion: str
     secondary_emotion: str
-    detected_age: int
+    detected_age: Optional[int] = None  # None when demography was skipped under load
     detected_gender: str
     emotion_scores: Dict[str, float]
-    recommendations: List[RecommendationItem]
\ No newline at end of file
+    recommendations: List[RecommendationItem]
+    degradation_level: int = 0  # 0 = full pipeline; see app/services/degradation.py
+
+# Returned by POST /jobs and GET /jobs/{job_id}
+class JobStatus(BaseModel):
+    job_id: str
+    status: str  # queued | running | done | failed
+    category: Category
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    attempts: int = 0
+    result: Optional[VibeResponse] = None
+    error: Optional[str] = None
\ No newline at end of file
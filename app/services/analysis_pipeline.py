@@ -0,0 +1,69 @@
+import time
+
+from fastapi import HTTPException
+
+from app.schemas.analysis import Category, VibeResponse
+from app.services.vision_service import analyze_image_with_smart_ai
+from app.services.video_service import analyze_video_with_smart_ai
+from app.services.llm_services import get_recommendations_from_gemini
+from app.services.degradation import degradation
+from app.services.profiler import profile_request
+from app.services import request_log
+
+
+def run_analysis(data: bytes | memoryview, kind: str, category: Category, source: str = "analyze",
+                 accepted_at: float | None = None) -> VibeResponse:
+    """
+    The full analysis behind /analyze and the job workers: vision, then Gemini recommendations.
+    'kind' is the sniffed upload format ('image', 'gif' or 'video').
+    Raises HTTPException (400 no face, 500 AI failure) exactly as the synchronous endpoint reports it.
+    The end-to-end latency (from accepted_at, a perf_counter() taken when the request was accepted, so
+    any wait for a worker thread is included) feeds the degradation controller; the level in effect
+    is reported in the response.
+    Every call also writes one structured event to the request log ('source' is 'analyze' or 'job').
+    """
+    with request_log.track_request(source, kind, category.value, len(data)) as event, \
+            degradation.track() as level, profile_request():
+        event.set(degradation_level=level)
+        started = time.perf_counter()
+        if accepted_at is None:
+            accepted_at = started
+        elif started > accepted_at:
+            event.stage("thread_wait", started - accepted_at)
+        try:
+            # 1. Process the Image (or short clip / GIF) and Extract User Context (Emotion, Age, Gender)
+            if kind == "image":
+                user_context = analyze_image_with_smart_ai(data)
+            else:
+                user_context = analyze_video_with_smart_ai(data, kind)
+            vision_done = time.perf_counter()
+            event.stage("vision", vision_done - started)
+
+            if not user_context:
+                # If the vision pipeline fails to detect a face or extract data
+                raise HTTPException(status_code=400, detail="Face could not be detected or analyzed.")
+
+            # 2. Get Recommendations from the LLM (Gemini)
+            recommendation_data = get_recommendations_from_gemini(user_context, category)
+            event.stage("recommendations", time.perf_counter() - vision_done)
+        finally:
+            degradation.record_latency(time.perf_counter() - accepted_at)
+
+        if not recommendation_data:
+            # If the LLM service or its retry mechanism fails
+            raise HTTPException(status_code=500, detail="AI service failed to return a response.")
+        event.set(recommendations=len(recommendation_data['recommendations']))
+
+        # 3. Construct and Return the Final Response
+        # Merge the user context (from Vision) with the recommendations (from LLM)
+        return VibeResponse(
+            mood_title=recommendation_data['mood_title'],
+            mood_description=recommendation_data['mood_description'],
+            recommendations=recommendation_data['recommendations'],
+            dominant_emotion=user_context['emotion'],
+            secondary_emotion=user_context['secondary_emotion'],
+            detected_age=user_context['age'],
+            detected_gender=user_context['gender'],
+            emotion_scores=user_context['raw_emotion_scores'],
+            degradation_level=level
+        )
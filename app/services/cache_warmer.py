@@ -0,0 +1,206 @@
+import json
+import os
+import threading
+import time
+from collections import Counter, deque
+from pathlib import Path
+
+from app.core.config import settings
+from app.schemas.analysis import Category
+from app.services.degradation import degradation, NORMAL
+from app.services.enrichment_scheduler import enrichment_scheduler
+from app.services.search_service import get_metadata_expiry, refresh_content_metadata
+
+# --- CONFIGURATION ---
+REFRESH_AHEAD_RATIO = 0.25  # Refresh an entry once less than this share of its TTL is left
+MAX_INITIAL_READ_BYTES = 16 * 1024 * 1024  # On start-up only the tail of a large log is read
+BUSY_RETRY_SEC = 5.0  # Pause while live traffic is queued or the service is degraded
+MIN_RECOMMENDATIONS = 2  # A title recommended only once is not worth warming
+MISS_RETRY_SEC = 3600  # A title the providers could not resolve (nothing cached) is retried this rarely
+
+
+# --- RECOMMENDATION HISTORY (append-only JSONL) ---
+class RecommendationHistory:
+    """
+    Append-only log of recommendations: one JSON line per Gemini answer with the category,
+    dominant/secondary emotion and the recommended titles. Lines are written with a single
+    O_APPEND write, so several worker processes can share the file.
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+    def append(self, category: Category, emotion: str, secondary_emotion: str, recommendations: list):
+        entry = {
+            "ts": round(time.time(), 3),
+            "category": category.value,
+            "emotion": emotion,
+            "secondary_emotion": secondary_emotion,
+            "titles": [
+                {"title": item.get("title", ""), "creator": item.get("creator", "")}
+                for item in recommendations if item.get("title")
+            ],
+        }
+        line = (json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8")
+        try:
+            with self._lock:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+                try:
+                    os.write(fd, line)
+                finally:
+                    os.close(fd)
+        except OSError as e:
+            print(f"⚠️ Recommendation history write failed: {e}")
+
+
+# --- CACHE WARMER ---
+class CacheWarmer:
+    """
+    Background thread that keeps the metadata cache warm for the most frequently recommended titles.
+    Every interval it reads new history lines, ranks (category, title, creator) by frequency within
+    the lookback window and re-resolves the top titles whose cache entry is missing or about to expire.
+    Outbound work is rate limited, runs on a single thread and pauses whenever live requests are
+    waiting for enrichment or the degradation ladder is active. The metadata cache is per process,
+    so every API worker runs a warmer; CACHE_WARMER_RATE_PER_MIN is split between the
+    CACHE_WARMER_PROCESSES of them so the total provider rate stays at the configured limit.
+    """
+
+    def __init__(self, history_path: str):
+        self.history_path = Path(history_path)
+        self._offset = 0
+        self._entries: deque = deque()  # (ts, (category, title, creator)) within the lookback window
+        self._last_attempt: dict[tuple, float] = {}  # (category, title, creator) -> wall time of the last lookup
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.refreshed = 0
+        self.last_pass_at: float | None = None
+
+    def start(self):
+        if self._thread is not None or not settings.CACHE_WARMER_ENABLED:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="cache-warmer", daemon=True)
+        self._thread.start()
+        print(f" Cache warmer started (top {settings.CACHE_WARMER_TOP_N} titles, "
+              f"{self.rate_per_min:g}/min, every {settings.CACHE_WARMER_INTERVAL:g}s)")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(5.0)
+            self._thread = None
+
+    @property
+    def rate_per_min(self) -> float:
+        """This process' share of CACHE_WARMER_RATE_PER_MIN."""
+        return settings.CACHE_WARMER_RATE_PER_MIN / max(1, settings.CACHE_WARMER_PROCESSES)
+
+    # --- History reading ---
+    def _read_new_entries(self):
+        try:
+            size = self.history_path.stat().st_size
+        except FileNotFoundError:
+            return
+        if size < self._offset:
+            self._offset = 0  # Log was rotated or truncated
+        skip_partial = False
+        if self._offset == 0 and size > MAX_INITIAL_READ_BYTES:
+            self._offset = size - MAX_INITIAL_READ_BYTES
+            skip_partial = True
+
+        with open(self.history_path, "rb") as f:
+            f.seek(self._offset)
+            if skip_partial:
+                self._offset += len(f.readline())
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break  # Line still being written; read it next pass
+                self._offset += len(raw)
+                try:
+                    entry = json.loads(raw)
+                    for t in entry["titles"]:
+                        self._entries.append((entry["ts"], (entry["category"], t["title"], t.get("creator", ""))))
+                except (ValueError, KeyError, TypeError):
+                    continue
+
+        cutoff = time.time() - settings.CACHE_WARMER_LOOKBACK_DAYS * 86400
+        while self._entries and self._entries[0][0] < cutoff:
+            self._entries.popleft()
+
+    def top_titles(self) -> list[tuple[tuple, int]]:
+        return Counter(key for _, key in self._entries).most_common(settings.CACHE_WARMER_TOP_N)
+
+    # --- Warming ---
+    def _busy(self) -> bool:
+        return degradation.level > NORMAL or enrichment_scheduler.stats()["queued_items"] > 0
+
+    def _due(self, key: tuple, category: Category, title: str, creator: str) -> bool:
+        expires_at = get_metadata_expiry(title, creator, category)
+        if expires_at is None:
+            # Not cached: either never looked up here, evicted, or nothing was found last time.
+            # Lookups that find nothing are not cached, so only retry those after MISS_RETRY_SEC
+            return time.time() - self._last_attempt.get(key, 0.0) >= MISS_RETRY_SEC
+        ttl = settings.METADATA_CACHE_TTL_MINUTES * 60
+        return expires_at - time.time() < ttl * REFRESH_AHEAD_RATIO
+
+    def warm_once(self) -> int:
+        """One pass over the most frequent titles. Returns how many were re-resolved."""
+        self._read_new_entries()
+        min_gap = 60.0 / self.rate_per_min if self.rate_per_min > 0 else 0.0
+        refreshed = 0
+        top = self.top_titles()
+        # Forget attempts on titles that dropped out of the ranking
+        ranked = {key for key, _ in top}
+        self._last_attempt = {k: v for k, v in self._last_attempt.items() if k in ranked}
+        for key, count in top:
+            category_value, title, creator = key
+            if self._stop.is_set() or count < MIN_RECOMMENDATIONS:
+                break
+            try:
+                category = Category(category_value)
+            except ValueError:
+                continue
+            if not self._due(key, category, title, creator):
+                continue
+            while self._busy():
+                if self._stop.wait(BUSY_RETRY_SEC):
+                    return refreshed
+
+            started = time.monotonic()
+            self._last_attempt[key] = time.time()
+            try:
+                refresh_content_metadata(title, creator, category)
+                refreshed += 1
+            except Exception as e:
+                print(f"⚠️ Cache warmer failed for '{title}': {e}")
+            # Rate limit: at most this process' share of CACHE_WARMER_RATE_PER_MIN lookups per minute
+            if self._stop.wait(max(0.0, min_gap - (time.monotonic() - started))):
+                break
+
+        self.refreshed += refreshed
+        self.last_pass_at = time.time()
+        if refreshed:
+            print(f"🔥 Cache warmer refreshed {refreshed} popular title(s)")
+        return refreshed
+
+    def _run(self):
+        while not self._stop.wait(settings.CACHE_WARMER_INTERVAL):
+            try:
+                self.warm_once()
+            except Exception as e:
+                print(f"⚠️ Cache warmer pass failed: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self._thread is not None,
+            "tracked_recommendations": len(self._entries),
+            "refreshed_total": self.refreshed,
+            "last_pass_at": self.last_pass_at,
+        }
+
+
+# Shared instances: llm_services appends to the history, main.py's lifespan runs the warmer
+recommendation_history = RecommendationHistory(settings.RECOMMENDATION_LOG_PATH)
+cache_warmer = CacheWarmer(settings.RECOMMENDATION_LOG_PATH)
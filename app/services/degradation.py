@@ -0,0 +1,208 @@
+import contextvars
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from app.core.config import settings
+from app.services.enrichment_scheduler import enrichment_scheduler
+
+# --- DEGRADATION LEVELS (each level includes every cheaper step before it) ---
+NORMAL = 0
+FAST_DETECTOR = 1  # Demography uses the cheap face detector instead of RetinaFace
+SKIP_DEMOGRAPHY = 2  # No age/gender model; only face detection + HSEmotion
+SKIP_IMAGE_VALIDATION = 3  # Provider poster URLs are trusted without downloading them
+SKIP_DDGS = 4  # No DuckDuckGo image fallback; missing posters get the placeholder
+CACHED_RECOMMENDATIONS = 5  # Recent recommendations for the same category/emotion replace the Gemini call
+
+LEVEL_NAMES = [
+    "normal",
+    "fast_detector",
+    "skip_demography",
+    "skip_image_validation",
+    "skip_ddgs",
+    "cached_recommendations",
+]
+
+# --- CONFIGURATION ---
+LATENCY_EWMA_ALPHA = 0.3
+RECOVER_PRESSURE = 0.6  # Step back up only when every signal is this far below its limit (hysteresis)
+ENRICHMENT_BACKLOG_PER_WORKER = 2  # Queued enrichment items per worker thread that count as full load
+IDLE_LATENCY_RESET = 30.0  # Seconds without traffic after which the latency EWMA stops counting as load
+JOB_BACKLOG_SAMPLE_SEC = 1.0  # Queued jobs are counted in the SQLite queue at most this often
+
+
+class DegradationController:
+    """
+    Load-shedding ladder for the analysis pipeline.
+    Pressure is the worst of four signals, each normalised so 1.0 means "at the limit":
+    outstanding analyses (API requests waiting for or holding a worker thread, plus running jobs),
+    the backlog of queued jobs, the enrichment backlog and the EWMA of end-to-end latency
+    (measured from when the API accepted the request, so time spent waiting for a thread counts).
+    Above 1.0 the level steps down one rung per cooldown; below RECOVER_PRESSURE it steps back up.
+    Each analysis runs at the level in effect when it started: track() pins it for the request and
+    components read it through current_level(), so every skip decision matches the reported level.
+    """
+
+    def __init__(self, enabled: bool, max_inflight: int, max_queued_jobs: int, target_latency: float,
+                 cooldown: float, max_level: int):
+        self.enabled = enabled
+        self.max_inflight = max(1, max_inflight)
+        self.max_queued_jobs = max(1, max_queued_jobs)
+        self.target_latency = target_latency
+        self.cooldown = cooldown
+        self.max_level = min(max_level, len(LEVEL_NAMES) - 1)
+        self._lock = threading.Lock()
+        self._level = NORMAL
+        self._outstanding = 0
+        self._latency_ewma: float | None = None
+        self._queued_jobs = 0
+        self._jobs_sampled_at = 0.0
+        self._last_sample_at = 0.0
+        self._changed_at = 0.0
+        self._transitions = 0
+
+    @property
+    def level(self) -> int:
+        return self._level
+
+    def _sample_job_backlog(self):
+        # Not under the lock (SQLite read) and never on the event loop: called from analysis threads only
+        now = time.monotonic()
+        if now - self._jobs_sampled_at < JOB_BACKLOG_SAMPLE_SEC:
+            return
+        self._jobs_sampled_at = now
+        from app.services.job_queue import job_queue
+
+        try:
+            self._queued_jobs = job_queue.stats().get("queued", 0)
+        except sqlite3.Error:
+            pass
+
+    def _pressure(self, now: float) -> dict:
+        # Caller must hold the lock
+        latency = self._latency_ewma or 0.0
+        if self._outstanding == 0 and now - self._last_sample_at > IDLE_LATENCY_RESET:
+            latency = 0.0  # Idle: an old latency spike no longer says anything about current load
+        backlog = enrichment_scheduler.stats()["queued_items"]
+        return {
+            "inflight": self._outstanding / self.max_inflight,
+            "job_backlog": self._queued_jobs / self.max_queued_jobs,
+            "enrichment_backlog": backlog / max(1, settings.ENRICHMENT_WORKERS * ENRICHMENT_BACKLOG_PER_WORKER),
+            "latency": latency / self.target_latency if self.target_latency > 0 else 0.0,
+        }
+
+    def _evaluate(self):
+        # Caller must hold the lock
+        if not self.enabled:
+            return
+        now = time.monotonic()
+        if now - self._changed_at < self.cooldown:
+            return
+        pressure = max(self._pressure(now).values())
+        new_level = self._level
+        if pressure > 1.0 and self._level < self.max_level:
+            new_level += 1
+        elif pressure < RECOVER_PRESSURE and self._level > NORMAL:
+            new_level -= 1
+        if new_level != self._level:
+            direction = "down" if new_level > self._level else "up"
+            print(f"⚖️ Degradation {direction}: {LEVEL_NAMES[self._level]} -> {LEVEL_NAMES[new_level]} "
+                  f"(pressure {pressure:.2f}, outstanding {self._outstanding}, queued jobs {self._queued_jobs})")
+            self._level = new_level
+            self._changed_at = now
+            self._transitions += 1
+
+    @contextmanager
+    def admit(self) -> Iterator[None]:
+        """
+        Counts one analysis as outstanding from when it is accepted (an /analyze request before it
+        gets a worker thread, a job once claimed) until it finishes.
+        """
+        with self._lock:
+            self._outstanding += 1
+            self._evaluate()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._outstanding -= 1
+                self._evaluate()
+
+    @contextmanager
+    def track(self) -> Iterator[int]:
+        """Wraps one analysis run; pins and yields the level in effect when it started."""
+        self._sample_job_backlog()
+        with self._lock:
+            self._evaluate()
+            level = self._level
+        token = _request_level.set(level)
+        try:
+            yield level
+        finally:
+            _request_level.reset(token)
+
+    def record_latency(self, seconds: float):
+        """Feeds one analysis' end-to-end latency into the EWMA."""
+        self._sample_job_backlog()
+        with self._lock:
+            previous = self._latency_ewma
+            self._latency_ewma = seconds if previous is None else (
+                LATENCY_EWMA_ALPHA * seconds + (1 - LATENCY_EWMA_ALPHA) * previous
+            )
+            self._last_sample_at = time.monotonic()
+            self._evaluate()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            now = time.monotonic()
+            return {
+                "enabled": self.enabled,
+                "level": self._level,
+                "level_name": LEVEL_NAMES[self._level],
+                "max_level": self.max_level,
+                "outstanding": self._outstanding,
+                "queued_jobs": self._queued_jobs,
+                "pressure": {k: round(v, 3) for k, v in self._pressure(now).items()},
+                "latency_ewma_sec": round(self._latency_ewma, 3) if self._latency_ewma is not None else None,
+                "seconds_at_level": round(now - self._changed_at, 1) if self._transitions else None,
+                "transitions": self._transitions,
+            }
+
+
+# The level the current analysis was pinned to by track(); None outside an analysis
+_request_level: contextvars.ContextVar[int | None] = contextvars.ContextVar("degradation_level", default=None)
+
+
+# Shared instance used by the analysis pipeline, vision, search and LLM services
+degradation = DegradationController(
+    enabled=settings.DEGRADATION_ENABLED,
+    max_inflight=settings.DEGRADE_MAX_INFLIGHT,
+    max_queued_jobs=settings.DEGRADE_MAX_QUEUED_JOBS,
+    target_latency=settings.DEGRADE_TARGET_LATENCY,
+    cooldown=settings.DEGRADE_COOLDOWN,
+    max_level=settings.DEGRADE_MAX_LEVEL,
+)
+
+
+def current_level() -> int:
+    """The running analysis' pinned level; the live level outside one (e.g. in the cache warmer)."""
+    level = _request_level.get()
+    return degradation.level if level is None else level
+
+
+def bind_level(fn):
+    """Wraps fn so it sees the calling analysis' pinned level from another thread (e.g. the enrichment pool)."""
+    level = _request_level.get()
+    if level is None:
+        return fn
+
+    def bound(*args, **kwargs):
+        token = _request_level.set(level)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _request_level.reset(token)
+
+    return bound
@@ -0,0 +1,136 @@
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, List
+
+from app.core.config import settings
+
+
+class EnrichmentBatch:
+    """
+    The enrichment work of a single request.
+    Items are submitted one by one (possibly while Gemini is still streaming); wait() returns the
+    enriched items in submission order, substituting the original (Gemini-supplied) item for
+    anything not finished within 'deadline' seconds of the wait() call.
+    """
+
+    def __init__(self, scheduler: "EnrichmentScheduler", fn: Callable[[dict], dict], deadline: float):
+        self._scheduler = scheduler
+        self._fn = fn
+        self.deadline = deadline
+        self._cond = threading.Condition()
+        self._items: List[dict] = []
+        self._results: dict[int, dict] = {}
+        self._pending: deque = deque()
+        self.expired = False
+        self.unfinished = 0  # Items that missed the deadline (set by wait())
+
+    def submit(self, item: dict):
+        with self._cond:
+            index = len(self._items)
+            self._items.append(item)
+        self._scheduler._enqueue(self, index)
+
+    def __len__(self) -> int:
+        with self._cond:
+            return len(self._items)
+
+    def cancel(self):
+        """Drops all queued work, e.g. when the Gemini attempt that produced the items failed."""
+        with self._cond:
+            self.expired = True
+            self._cond.notify_all()
+
+    def _run(self, index: int):
+        item = self._items[index]
+        try:
+            # Work on a copy so a late worker never mutates an item that was already returned
+            result = self._fn(dict(item))
+        except Exception as e:
+            print(f"Enrichment error for {item.get('title')}: {e}")
+            result = item
+        with self._cond:
+            if not self.expired:
+                self._results[index] = result
+            self._cond.notify_all()
+
+    def wait(self) -> List[dict]:
+        deadline_at = time.monotonic() + self.deadline
+        with self._cond:
+            while len(self._results) < len(self._items):
+                remaining = deadline_at - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            self.expired = True
+            unfinished = self.unfinished = len(self._items) - len(self._results)
+            if unfinished:
+                print(f"⏰ Enrichment deadline reached: {unfinished}/{len(self._items)} item(s) use Gemini fallback values")
+            return [self._results.get(i, item) for i, item in enumerate(self._items)]
+
+
+class EnrichmentScheduler:
+    """
+    Long-lived, process-wide pool for metadata enrichment.
+    A fixed number of worker threads bounds outbound work globally, and pending tasks are
+    served round-robin across requests so one large batch cannot starve the others.
+    """
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self._cond = threading.Condition()
+        self._ready: deque = deque()  # Batches that still have queued tasks, in round-robin order
+        self._threads: List[threading.Thread] = []
+
+    def open_batch(self, fn: Callable[[dict], dict], deadline: float | None = None) -> EnrichmentBatch:
+        self._ensure_started()
+        return EnrichmentBatch(self, fn, deadline if deadline is not None else settings.ENRICHMENT_DEADLINE)
+
+    def _ensure_started(self):
+        with self._cond:
+            if self._threads:
+                return
+            for i in range(self.max_workers):
+                t = threading.Thread(target=self._worker, name=f"enrichment-{i}", daemon=True)
+                t.start()
+                self._threads.append(t)
+
+    def _enqueue(self, batch: EnrichmentBatch, index: int):
+        with self._cond:
+            if not batch._pending:
+                self._ready.append(batch)
+            batch._pending.append(index)
+            self._cond.notify()
+
+    def _next_task(self) -> tuple[EnrichmentBatch, int]:
+        with self._cond:
+            while True:
+                while not self._ready:
+                    self._cond.wait()
+                batch = self._ready.popleft()
+                if batch.expired:
+                    # The request already returned; drop its remaining work
+                    batch._pending.clear()
+                    continue
+                index = batch._pending.popleft()
+                if batch._pending:
+                    self._ready.append(batch)
+                return batch, index
+
+    def _worker(self):
+        while True:
+            batch, index = self._next_task()
+            batch._run(index)
+
+    def stats(self) -> dict[str, Any]:
+        with self._cond:
+            return {
+                "workers": len(self._threads),
+                "queued_batches": len(self._ready),
+                "queued_items": sum(len(b._pending) for b in self._ready),
+            }
+
+
+# Shared instance used by all requests
+enrichment_scheduler = EnrichmentScheduler(settings.ENRICHMENT_WORKERS)
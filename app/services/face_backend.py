@@ -0,0 +1,165 @@
+import threading
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from app.core.config import settings
+
+# --- CONFIGURATION ---
+# 'full': DeepFace (RetinaFace + TensorFlow age/gender). 'slim': OpenCV DNN only, TensorFlow is never imported.
+PROFILE = settings.VISION_PROFILE
+SLIM_MODELS_DIR = Path(settings.SLIM_MODELS_DIR)
+
+SLIM_MODEL_FILES = {
+    "face": "face_detection_yunet_2023mar.onnx",
+    "age_proto": "age_deploy.prototxt",
+    "age_model": "age_net.caffemodel",
+    "gender_proto": "gender_deploy.prototxt",
+    "gender_model": "gender_net.caffemodel",
+}
+
+# Levi & Hassner age/gender nets: input statistics, age buckets and their midpoints
+AGE_GENDER_MEAN = (78.4263377603, 87.7689143744, 114.895847746)
+AGE_BUCKET_MIDPOINTS = [1, 5, 10, 17, 28, 40, 50, 70]  # (0-2) (4-6) (8-12) (15-20) (25-32) (38-43) (48-53) (60-100)
+GENDERS = ["Man", "Woman"]
+SLIM_FACE_SCORE_THRESHOLD = 0.7
+
+
+# --- FULL PROFILE (DeepFace) ---
+def _deepface_detect(img: np.ndarray, fast: bool) -> tuple[int, int, int, int] | None:
+    from deepface import DeepFace
+
+    face_objs = DeepFace.extract_faces(
+        img_path=img,
+        detector_backend='opencv' if fast else 'retinaface',
+        enforce_detection=False,
+        align=False
+    )
+    # With enforce_detection=False a miss comes back as the whole frame with zero confidence
+    if not face_objs or face_objs[0].get('confidence', 0) <= 0:
+        return None
+    area = face_objs[0]['facial_area']
+    return area['x'], area['y'], area['w'], area['h']
+
+
+def _deepface_demography(img: np.ndarray, fast: bool) -> dict:
+    from deepface import DeepFace
+
+    demography = DeepFace.analyze(
+        img_path=img,
+        actions=['age', 'gender'],
+        detector_backend='opencv' if fast else 'retinaface',
+        enforce_detection=False,
+        silent=True
+    )[0]
+    return {
+        "age": int(demography['age']),
+        "gender": demography['dominant_gender'],
+        "region": demography['region'],
+    }
+
+
+def _deepface_preload():
+    from deepface import DeepFace
+
+    DeepFace.build_model(model_name="retinaface", task="face_detector")
+    DeepFace.build_model(model_name="opencv", task="face_detector")
+    DeepFace.build_model(model_name="Age", task="facial_attribute")
+    DeepFace.build_model(model_name="Gender", task="facial_attribute")
+
+
+# --- SLIM PROFILE (OpenCV DNN: YuNet face detector + Caffe age/gender nets) ---
+_slim_lock = threading.Lock()  # cv2.dnn nets and FaceDetectorYN are not safe for concurrent use
+_slim_models: dict | None = None
+
+
+def _load_slim_models() -> dict:
+    global _slim_models
+    if _slim_models is None:
+        paths = {key: SLIM_MODELS_DIR / name for key, name in SLIM_MODEL_FILES.items()}
+        missing = [str(p) for p in paths.values() if not p.exists()]
+        if missing:
+            raise FileNotFoundError(
+                f"Slim vision models missing ({', '.join(missing)}). Run: python scripts/download_slim_models.py"
+            )
+        _slim_models = {
+            "face": cv2.FaceDetectorYN.create(str(paths["face"]), "", (320, 320), SLIM_FACE_SCORE_THRESHOLD),
+            "age": cv2.dnn.readNetFromCaffe(str(paths["age_proto"]), str(paths["age_model"])),
+            "gender": cv2.dnn.readNetFromCaffe(str(paths["gender_proto"]), str(paths["gender_model"])),
+        }
+    return _slim_models
+
+
+def _slim_detect(img: np.ndarray, fast: bool = False) -> tuple[int, int, int, int] | None:
+    with _slim_lock:
+        detector = _load_slim_models()["face"]
+        h, w = img.shape[:2]
+        detector.setInputSize((w, h))
+        _, faces = detector.detect(img)
+
+    if faces is None or len(faces) == 0:
+        return None
+    # Each row: x, y, w, h, 5 landmarks (x, y), score. Keep the largest face.
+    x, y, bw, bh = max(faces, key=lambda f: f[2] * f[3])[:4]
+    x, y = max(int(x), 0), max(int(y), 0)
+    return x, y, min(int(bw), w - x), min(int(bh), h - y)
+
+
+def _slim_demography(img: np.ndarray) -> dict:
+    h, w = img.shape[:2]
+    box = _slim_detect(img)
+    if box is None:
+        # Mirror DeepFace's enforce_detection=False behaviour: fall back to the whole image
+        box = (0, 0, w, h)
+
+    # Age/gender nets were trained on loosely cropped faces: pad the box by 20%
+    x, y, bw, bh = box
+    pad_x, pad_y = int(bw * 0.2), int(bh * 0.2)
+    face = img[max(y - pad_y, 0):min(y + bh + pad_y, h), max(x - pad_x, 0):min(x + bw + pad_x, w)]
+    blob = cv2.dnn.blobFromImage(face, 1.0, (227, 227), AGE_GENDER_MEAN, swapRB=False)
+
+    with _slim_lock:
+        models = _load_slim_models()
+        models["gender"].setInput(blob)
+        gender_preds = models["gender"].forward()[0]
+        models["age"].setInput(blob)
+        age_preds = models["age"].forward()[0]
+
+    return {
+        "age": AGE_BUCKET_MIDPOINTS[int(np.argmax(age_preds))],
+        "gender": GENDERS[int(np.argmax(gender_preds))],
+        "region": {"x": x, "y": y, "w": bw, "h": bh},
+    }
+
+
+# --- PUBLIC API (profile-independent) ---
+def detect_face(img: np.ndarray, fast: bool = False) -> tuple[int, int, int, int] | None:
+    """Returns the main face box (x, y, w, h) or None. 'fast' picks the cheaper detector where there is a choice."""
+    if PROFILE == "slim":
+        return _slim_detect(img, fast)
+    return _deepface_detect(img, fast)
+
+
+def analyze_demography(img: np.ndarray, fast: bool = False) -> dict:
+    """Returns {'age', 'gender', 'region'} for the main face (region is the whole image if none is found)."""
+    if PROFILE == "slim":
+        return _slim_demography(img)
+    return _deepface_demography(img, fast)
+
+
+def preload_is_fork_safe() -> bool:
+    """
+    Whether preload() may run in a pre-fork master. Building DeepFace's Keras models starts the
+    TensorFlow runtime and its thread pools, which do not survive fork(); the OpenCV nets do.
+    """
+    return PROFILE == "slim"
+
+
+def preload():
+    """Loads the active profile's detector and demography weights without running inference."""
+    if PROFILE == "slim":
+        with _slim_lock:
+            _load_slim_models()
+    else:
+        _deepface_preload()
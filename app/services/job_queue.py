@@ -0,0 +1,355 @@
+import heapq
+import ipaddress
+import itertools
+import json
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import closing
+from pathlib import Path
+from typing import List
+from urllib.parse import urlsplit
+
+import requests
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.schemas.analysis import Category
+
+# --- CONFIGURATION ---
+CALLBACK_TIMEOUT = 5  # Seconds per completion callback POST
+CALLBACK_RETRIES = 3
+CALLBACK_RETRY_DELAY = 2
+CALLBACK_THREADS = 2  # Delivery threads, separate from the job workers
+CALLBACK_MAX_PENDING = 1000  # Callbacks waiting for delivery or a retry; further ones are dropped
+PURGE_INTERVAL = 600  # Seconds between purges of expired finished jobs
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,            -- queued | running | done | failed
+    category TEXT NOT NULL,
+    kind TEXT NOT NULL,              -- image | gif | video
+    payload BLOB,                    -- The upload; dropped once the job has finished
+    callback_url TEXT,
+    result TEXT,                     -- VibeResponse JSON
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at);
+"""
+
+
+class JobQueue:
+    """
+    Durable analysis queue in a local SQLite file.
+    Several processes (API workers and standalone job workers) can share one database: a job is
+    claimed inside an immediate write transaction, and a 'running' job whose lease expired (its
+    worker died or is too slow) is handed out again until it runs out of attempts. Each claim bumps
+    'attempts', which then identifies the run: only the current run may finish the job.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = Path(db_path)
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        # One short-lived autocommit connection per operation: sqlite3 connections must not cross threads
+        if not self._initialized:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        if not self._initialized:
+            with self._init_lock:
+                if not self._initialized:
+                    conn.execute("PRAGMA journal_mode=WAL")  # Readers never block the writer
+                    conn.executescript(SCHEMA)
+                    self._initialized = True
+        return conn
+
+    def enqueue(self, data: bytes | memoryview, kind: str, category: Category, callback_url: str | None = None) -> str:
+        job_id = uuid.uuid4().hex
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, status, category, kind, payload, callback_url, created_at) "
+                "VALUES (?, 'queued', ?, ?, ?, ?, ?)",
+                (job_id, category.value, kind, bytes(data), callback_url, time.time())
+            )
+        return job_id
+
+    def claim(self) -> sqlite3.Row | None:
+        """Atomically takes the oldest runnable job and marks it running (None if there is none)."""
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            # Jobs whose worker died mid-run go back to the queue, or fail once out of attempts
+            stale_before = now - settings.JOB_LEASE_SECONDS
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', error = 'Worker lost; retry limit reached.', payload = NULL, "
+                "finished_at = ? WHERE status = 'running' AND started_at < ? AND attempts >= ?",
+                (now, stale_before, settings.JOB_MAX_ATTEMPTS)
+            )
+            conn.execute(
+                "UPDATE jobs SET status = 'queued' WHERE status = 'running' AND started_at < ?",
+                (stale_before,)
+            )
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE jobs SET status = 'running', started_at = ?, attempts = attempts + 1 WHERE id = ?",
+                    (now, row["id"])
+                )
+            conn.execute("COMMIT")
+            return row
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def finish(self, job_id: str, attempt: int, result: dict | None = None, error: str | None = None) -> bool:
+        """
+        Records the outcome of run 'attempt' (the job's attempts value after claim()).
+        Returns False if that run no longer owns the job (its lease expired and it was re-queued or failed).
+        """
+        with closing(self._connect()) as conn:
+            return conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, payload = NULL, finished_at = ? "
+                "WHERE id = ? AND status = 'running' AND attempts = ?",
+                ("failed" if error else "done", json.dumps(result) if result is not None else None,
+                 error, time.time(), job_id, attempt)
+            ).rowcount > 0
+
+    def get(self, job_id: str) -> dict | None:
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT id AS job_id, status, category, result, error, attempts, created_at, started_at, finished_at "
+                "FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def purge_finished(self, older_than: float) -> int:
+        with closing(self._connect()) as conn:
+            return conn.execute(
+                "DELETE FROM jobs WHERE status IN ('done', 'failed') AND finished_at < ?", (older_than,)
+            ).rowcount
+
+    def stats(self) -> dict:
+        with closing(self._connect()) as conn:
+            rows = conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+
+# --- CALLBACKS ---
+def _is_public_address(address: str) -> bool:
+    ip = ipaddress.ip_address(address.split("%", 1)[0])  # Drop an IPv6 scope id
+    if ip.version == 6 and ip.ipv4_mapped is not None:
+        ip = ip.ipv4_mapped
+    # Excludes private, loopback, link-local (169.254.169.254 metadata), shared, reserved and unspecified ranges
+    return ip.is_global and not ip.is_multicast
+
+
+def check_callback_url(url: str) -> str | None:
+    """
+    Returns why a completion callback must not be POSTed to url, or None if it may.
+    With CALLBACK_ALLOWED_HOSTS set only those hosts are accepted; otherwise every address the host
+    resolves to must be public. Resolves DNS, so it blocks.
+    """
+    parsed = urlsplit(url)
+    if parsed.scheme not in ("http", "https") or not parsed.hostname:
+        return "callback_url must be an http(s) URL."
+    host = parsed.hostname.lower()
+    if settings.CALLBACK_ALLOWED_HOSTS:
+        return None if host in settings.CALLBACK_ALLOWED_HOSTS else "callback_url host is not allowed."
+    try:
+        port = parsed.port or (443 if parsed.scheme == "https" else 80)
+        addresses = {info[4][0] for info in socket.getaddrinfo(host, port, proto=socket.IPPROTO_TCP)}
+    except (ValueError, OSError):
+        return "callback_url host could not be resolved."
+    if not all(_is_public_address(address) for address in addresses):
+        return "callback_url must point to a public address."
+    return None
+
+
+class CallbackSender:
+    """
+    Delivers completion callbacks on its own threads, so a slow or failing receiver never holds up a
+    job worker. A failed POST is rescheduled after CALLBACK_RETRY_DELAY instead of sleeping.
+    Pending callbacks live in memory only; the job status itself stays available at GET /jobs/{id}.
+    """
+
+    def __init__(self, threads: int = CALLBACK_THREADS):
+        self.threads = threads
+        self._pending = []  # Heap of (due, seq, url, job, attempt)
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def start(self):
+        if self._threads:
+            return
+        self._stop.clear()
+        for i in range(self.threads):
+            t = threading.Thread(target=self._run, name=f"job-callback-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        for t in self._threads:
+            t.join(timeout)
+        self._threads = []
+        if self._pending:
+            print(f" {len(self._pending)} job callback(s) not delivered before shutdown")
+
+    def submit(self, url: str, job: dict, attempt: int = 1, delay: float = 0.0):
+        with self._cond:
+            if len(self._pending) >= CALLBACK_MAX_PENDING:
+                print(f" Job {job['job_id']} callback dropped: {CALLBACK_MAX_PENDING} callbacks pending")
+                return
+            heapq.heappush(self._pending, (time.monotonic() + delay, next(self._seq), url, job, attempt))
+            self._cond.notify()
+
+    def _next(self) -> tuple | None:
+        with self._cond:
+            while not self._stop.is_set():
+                timeout = None
+                if self._pending:
+                    timeout = self._pending[0][0] - time.monotonic()
+                    if timeout <= 0:
+                        return heapq.heappop(self._pending)
+                self._cond.wait(timeout)
+            return None
+
+    def _run(self):
+        while (item := self._next()) is not None:
+            _, _, url, job, attempt = item
+            self._deliver(url, job, attempt)
+
+    def _deliver(self, url: str, job: dict, attempt: int):
+        # Checked again at delivery: the host's DNS records may have changed since the job was queued
+        rejected = check_callback_url(url)
+        if rejected:
+            print(f" Job {job['job_id']} callback skipped: {rejected}")
+            return
+        try:
+            # No redirects: a public receiver must not bounce the POST to an internal address
+            response = requests.post(url, json=job, timeout=CALLBACK_TIMEOUT, allow_redirects=False)
+            response.raise_for_status()
+        except Exception as e:
+            print(f" Job {job['job_id']} callback attempt {attempt}/{CALLBACK_RETRIES} failed: {e}")
+            if attempt < CALLBACK_RETRIES:
+                self.submit(url, job, attempt + 1, CALLBACK_RETRY_DELAY)
+
+
+# --- WORKER POOL ---
+class JobWorkerPool:
+    """
+    Threads that run queued analyses through the same pipeline as /analyze.
+    Enqueues from this process wake a worker immediately; jobs enqueued by other processes are
+    picked up within JOB_POLL_INTERVAL.
+    """
+
+    def __init__(self, queue: JobQueue, workers: int):
+        self.queue = queue
+        self.workers = workers
+        self._wake = threading.Condition()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._last_purge = 0.0
+        self.callbacks = CallbackSender()
+
+    def start(self):
+        if self._threads or self.workers <= 0:
+            return
+        self._stop.clear()
+        self.callbacks.start()
+        for i in range(self.workers):
+            t = threading.Thread(target=self._worker, name=f"job-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        print(f" Job workers started: {self.workers} (queue: {self.queue.db_path})")
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        with self._wake:
+            self._wake.notify_all()
+        for t in self._threads:
+            t.join(timeout)
+        self._threads = []
+        self.callbacks.stop(timeout)
+
+    def notify(self):
+        with self._wake:
+            self._wake.notify()
+
+    def _worker(self):
+        # Imported here: the pipeline pulls in the vision and LLM services
+        from app.services.analysis_pipeline import run_analysis
+        from app.services.degradation import degradation
+
+        while not self._stop.is_set():
+            try:
+                row = self.queue.claim()
+            except sqlite3.Error as e:
+                print(f" Job queue error: {e}")
+                row = None
+
+            if row is None:
+                self._maybe_purge()
+                with self._wake:
+                    self._wake.wait(settings.JOB_POLL_INTERVAL)
+                continue
+
+            job_id = row["id"]
+            result, error = None, None
+            try:
+                with degradation.admit():
+                    result = run_analysis(row["payload"], row["kind"], Category(row["category"]), source="job").model_dump()
+            except HTTPException as e:
+                error = e.detail
+            except Exception as e:
+                print(f" Job {job_id} failed: {e}")
+                error = "Analysis failed."
+
+            attempt = row["attempts"] + 1  # claim() bumped it
+            if not self.queue.finish(job_id, attempt, result=result, error=error):
+                # The lease ran out mid-run and another run took over: that run reports the job
+                print(f" Job {job_id} attempt {attempt} lost its lease; result discarded")
+                continue
+            print(f" Job {job_id} {'failed' if error else 'done'} (attempt {attempt})")
+            if row["callback_url"]:
+                self.callbacks.submit(row["callback_url"], self.queue.get(job_id))
+
+    def _maybe_purge(self):
+        now = time.time()
+        if now - self._last_purge < PURGE_INTERVAL:
+            return
+        self._last_purge = now
+        removed = self.queue.purge_finished(now - settings.JOB_RETENTION_HOURS * 3600)
+        if removed:
+            print(f" Purged {removed} finished jobs")
+
+    def stats(self) -> dict:
+        return {"workers": len(self._threads), "jobs": self.queue.stats()}
+
+
+# Shared instances: the API enqueues into job_queue, job_workers runs the jobs (see main.py lifespan)
+job_queue = JobQueue(settings.JOB_DB_PATH)
+job_workers = JobWorkerPool(job_queue, settings.JOB_WORKERS)
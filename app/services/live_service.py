@@ -0,0 +1,156 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import List
+
+import cv2
+import numpy as np
+
+from app.core.config import settings
+from app.core.models import EMOTION_CLASSES
+from app.services.vision_service import analyze_live_frame, calculate_custom_emotion, get_secondary_emotion
+
+
+class LiveSession:
+    """
+    State of one /ws/live connection.
+    Holds a single frame slot (latest frame wins; older unprocessed frames are dropped),
+    the EMA-smoothed emotion scores and the most recent result for the sender loop.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+        self._lock = threading.Lock()
+        self._frame: bytes | None = None
+        self._frame_received_at = 0.0
+        self._busy = False  # True while a worker is running inference for this session
+        self._smoothed: np.ndarray | None = None
+        self.closed = False
+        self.frames_received = 0
+        self.frames_dropped = 0
+        self.frames_analyzed = 0
+        self.result: dict | None = None
+        self.result_ready = asyncio.Event()
+
+    def offer(self, frame: bytes) -> bool:
+        """Stores a frame in the slot. Returns True if the session needs to be queued for inference."""
+        with self._lock:
+            self.frames_received += 1
+            if self._frame is not None:
+                self.frames_dropped += 1
+            self._frame = frame
+            self._frame_received_at = time.monotonic()
+            return not self._busy
+
+    def take_frame(self) -> tuple[bytes, float] | None:
+        with self._lock:
+            if self._frame is None or self._busy or self.closed:
+                return None
+            frame, received_at = self._frame, self._frame_received_at
+            self._frame = None
+            self._busy = True
+            return frame, received_at
+
+    def finish(self) -> bool:
+        """Marks inference done. Returns True if a newer frame arrived meanwhile (needs re-queueing)."""
+        with self._lock:
+            self._busy = False
+            return self._frame is not None and not self.closed
+
+    def update(self, analysis: tuple[np.ndarray, tuple[int, int, int, int]] | None, received_at: float):
+        face = None
+        if analysis is not None:
+            raw_scores, (x, y, w, h) = analysis
+            raw_scores = np.asarray(raw_scores, dtype=np.float64)
+            alpha = settings.LIVE_SMOOTHING_ALPHA
+            if self._smoothed is None:
+                self._smoothed = raw_scores
+            else:
+                # Temporal smoothing: exponential moving average of the raw probabilities
+                self._smoothed = alpha * raw_scores + (1 - alpha) * self._smoothed
+            face = {"x": x, "y": y, "w": w, "h": h}
+
+        self.frames_analyzed += 1
+        payload = {
+            "face": face,
+            "dominant": "None",
+            "secondary": "None",
+            "scores": {},
+            "latency_ms": round((time.monotonic() - received_at) * 1000, 1),
+            "frames_received": self.frames_received,
+            "frames_dropped": self.frames_dropped,
+        }
+        if self._smoothed is not None:
+            dominant, adjusted = calculate_custom_emotion(self._smoothed)
+            raw_dict = {EMOTION_CLASSES[i]: float(v) for i, v in enumerate(self._smoothed)}
+            payload["dominant"] = dominant
+            payload["secondary"] = get_secondary_emotion(raw_dict, dominant)
+            payload["scores"] = {k: round(v, 4) for k, v in sorted(adjusted.items(), key=lambda i: i[1], reverse=True)}
+
+        self.result = payload
+        self._loop.call_soon_threadsafe(self.result_ready.set)
+
+
+class LiveInferenceWorker:
+    """
+    Persistent inference threads shared by all live sessions.
+    Sessions with a pending frame are served round-robin; each session is processed by
+    at most one thread at a time so its smoothing state stays ordered.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._cond = threading.Condition()
+        self._ready: deque = deque()
+        self._threads: List[threading.Thread] = []
+
+    def _ensure_started(self):
+        with self._cond:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                t = threading.Thread(target=self._worker, name=f"live-inference-{i}", daemon=True)
+                t.start()
+                self._threads.append(t)
+
+    def submit(self, session: LiveSession, frame: bytes):
+        if session.offer(frame):
+            self._ensure_started()
+            with self._cond:
+                if session not in self._ready:
+                    self._ready.append(session)
+                    self._cond.notify()
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while not self._ready:
+                    self._cond.wait()
+                session = self._ready.popleft()
+
+            taken = session.take_frame()
+            if taken is None:
+                continue
+            frame, received_at = taken
+
+            try:
+                img = cv2.imdecode(np.frombuffer(frame, np.uint8), cv2.IMREAD_COLOR)
+                analysis = analyze_live_frame(img) if img is not None else None
+                session.update(analysis, received_at)
+            except Exception as e:
+                print(f" Live inference error: {e}")
+
+            if session.finish():
+                with self._cond:
+                    if session not in self._ready:
+                        self._ready.append(session)
+                        self._cond.notify()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {"workers": len(self._threads), "sessions_waiting": len(self._ready)}
+
+
+# Shared instance used by every /ws/live connection
+live_worker = LiveInferenceWorker(settings.LIVE_INFERENCE_WORKERS)
@@ -1,39 +1,103 @@
+import copy
 import json
-import concurrent.futures
 import time
-import google.generativeai as genai
-from google.generativeai.types import HarmCategory, HarmBlockThreshold
+import threading
+from collections import OrderedDict
 
 from app.core.config import settings
 from app.schemas.analysis import Category
 from app.utils.timer import ExecutionTimer
-from app.core.prompts import build_gemini_prompt
+from app.core.prompts import build_gemini_prompt, SYSTEM_INSTRUCTIONS
+from app.utils.json_stream import ArrayElementStreamParser
 
 from app.services.search_service import get_content_metadata
+from app.services.enrichment_scheduler import enrichment_scheduler
+from app.services.degradation import bind_level, current_level, SKIP_IMAGE_VALIDATION, CACHED_RECOMMENDATIONS
+from app.services.poster_cache import poster_cache
+from app.services.cache_warmer import recommendation_history
+from app.services import request_log
 
 # --- CONFIGURATION ---
 MAX_RETRIES = 3  # Maximum number of retry attempts
 RETRY_DELAY = 2  # Delay in seconds between retries
+RECENT_RESPONSES_MAX = 64  # Fully enriched responses kept per (category, emotion) for the degradation ladder
 
 # --- GEMINI API CLIENT SETUP ---
-genai.configure(api_key=settings.GEMINI_API_KEY)
-
-safety_settings = [
-    {"category": HarmCategory.HARM_CATEGORY_HARASSMENT, "threshold": HarmBlockThreshold.BLOCK_NONE},
-    {"category": HarmCategory.HARM_CATEGORY_HATE_SPEECH, "threshold": HarmBlockThreshold.BLOCK_NONE},
-    {"category": HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT, "threshold": HarmBlockThreshold.BLOCK_NONE},
-    {"category": HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT, "threshold": HarmBlockThreshold.BLOCK_NONE},
-]
-
-model = genai.GenerativeModel(
-    model_name='gemini-flash-latest',
-    generation_config={
-        "response_mime_type": "application/json",
-        "temperature": 0.9,  # Increased for higher creativity
-        "top_p": 0.95,  # Broadened word selection pool
-    },
-    safety_settings=safety_settings
-)
+# The google.generativeai SDK (grpc/protobuf) is imported on first use, not when the app is imported
+_genai = None
+_genai_lock = threading.Lock()
+
+
+def _get_genai():
+    """Imports and configures the Gemini SDK once."""
+    global _genai
+    with _genai_lock:
+        if _genai is None:
+            import google.generativeai as genai
+
+            genai.configure(api_key=settings.GEMINI_API_KEY)
+            _genai = genai
+    return _genai
+
+
+def _safety_settings() -> list:
+    from google.generativeai.types import HarmCategory, HarmBlockThreshold
+
+    return [
+        {"category": HarmCategory.HARM_CATEGORY_HARASSMENT, "threshold": HarmBlockThreshold.BLOCK_NONE},
+        {"category": HarmCategory.HARM_CATEGORY_HATE_SPEECH, "threshold": HarmBlockThreshold.BLOCK_NONE},
+        {"category": HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT, "threshold": HarmBlockThreshold.BLOCK_NONE},
+        {"category": HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT, "threshold": HarmBlockThreshold.BLOCK_NONE},
+    ]
+
+
+generation_config = {
+    "response_mime_type": "application/json",
+    "temperature": 0.9,  # Increased for higher creativity
+    "top_p": 0.95,  # Broadened word selection pool
+}
+
+# --- PER-CATEGORY MODELS ---
+# Each category gets a model whose static persona/rules are a precompiled system instruction,
+# so the per-user message carries only the small payload. The instruction itself is still billed with
+# every request: at ~800 tokens it is below Gemini's minimum size for context caching.
+_category_models: dict = {}  # Category -> GenerativeModel
+_category_models_lock = threading.Lock()
+
+
+def get_model_for_category(category: Category):
+    """Returns the (cached) Gemini model configured with the category's system instruction."""
+    with _category_models_lock:
+        model = _category_models.get(category)
+        if model is None:
+            # Local object construction only (no network call), so building under the lock is cheap
+            genai = _get_genai()
+            model = _category_models[category] = genai.GenerativeModel(
+                model_name=settings.GEMINI_MODEL,
+                generation_config=generation_config,
+                safety_settings=_safety_settings(),
+                system_instruction=SYSTEM_INSTRUCTIONS[category]
+            )
+        return model
+
+
+# --- RECENT RESPONSES (served instead of calling Gemini at the CACHED_RECOMMENDATIONS level) ---
+_recent_responses: OrderedDict = OrderedDict()  # (Category, dominant emotion) -> response dict
+_recent_responses_lock = threading.Lock()
+
+
+def _remember_response(category: Category, emotion: str, data: dict):
+    with _recent_responses_lock:
+        _recent_responses[(category, emotion)] = copy.deepcopy(data)
+        _recent_responses.move_to_end((category, emotion))
+        while len(_recent_responses) > RECENT_RESPONSES_MAX:
+            _recent_responses.popitem(last=False)
+
+
+def _get_recent_response(category: Category, emotion: str) -> dict | None:
+    with _recent_responses_lock:
+        data = _recent_responses.get((category, emotion))
+        return copy.deepcopy(data) if data is not None else None
 
 
 # --- HELPER FUNCTIONS ---
@@ -48,7 +112,8 @@ def update_item_with_metadata(item: dict, category: Category) -> dict:
         
         # Merge metadata with item, only if metadata has valid values
         if metadata.get('poster') and str(metadata['poster']).strip():
-            item['poster_url'] = metadata['poster']
+            # Clients get the local resized-WebP proxy instead of the third-party URL
+            item['poster_url'] = poster_cache.public_url(metadata['poster'])
 
         if metadata.get('rating') and str(metadata['rating']).strip():
             item['rating'] = metadata['rating']
@@ -98,20 +163,47 @@ def get_recommendations_from_gemini(user_context: dict, category: Category) -> d
         print(f"Prompt Building Error: {e}")
         return get_fallback_response()
 
+    # Under the heaviest load, reuse a recent answer for the same category and emotion
+    if current_level() >= CACHED_RECOMMENDATIONS:
+        cached = _get_recent_response(category, dominant)
+        request_log.cache("recommendations", hit=cached is not None)
+        if cached:
+            print(f" Degraded: serving cached recommendations for {category.value}/{dominant}")
+            return cached
+
     # 2. Retry Mechanism
     data = None
+    gemini_started = time.perf_counter()
 
     for attempt in range(1, MAX_RETRIES + 1):
+        request_log.note(gemini_attempts=attempt)
+        # Recommendations are handed to the enrichment scheduler as soon as each one is streamed,
+        # so provider lookups overlap with the rest of the Gemini generation.
+        # The binds let the enrichment threads record into this request's event and use its pinned level.
+        batch = enrichment_scheduler.open_batch(
+            request_log.bind(bind_level(lambda item: update_item_with_metadata(item, category)))
+        )
+        parser = ArrayElementStreamParser("recommendations")
         try:
             with ExecutionTimer(f"Gemini AI ({category.value}) - Attempt {attempt}/{MAX_RETRIES}"):
-                response = model.generate_content(prompt)
-
-                # Check for empty response (e.g., due to safety block)
-                try:
-                    raw_text = response.text
-                except ValueError:
-                    print(
-                        f" Attempt {attempt}: Gemini returned an empty response. Reason: {response.prompt_feedback}")
+                response = get_model_for_category(category).generate_content(prompt, stream=True)
+
+                chunks = []
+                for chunk in response:
+                    # Check for empty response (e.g., due to safety block)
+                    try:
+                        text = chunk.text
+                    except ValueError:
+                        print(
+                            f" Attempt {attempt}: Gemini returned an empty response. Reason: {response.prompt_feedback}")
+                        raise ValueError("Empty Response from Gemini")
+
+                    chunks.append(text)
+                    for item in parser.feed(text):
+                        batch.submit(item)
+
+                raw_text = "".join(chunks)
+                if not raw_text.strip():
                     raise ValueError("Empty Response from Gemini")
 
                 # Clean and parse JSON
@@ -122,6 +214,7 @@ def get_recommendations_from_gemini(user_context: dict, category: Category) -> d
                 break
 
         except Exception as e:
+            batch.cancel()
             print(f" Attempt {attempt} Failed: {e}")
             if attempt < MAX_RETRIES:
                 print(f" Waiting for {RETRY_DELAY} seconds before retry...")
@@ -129,26 +222,36 @@ def get_recommendations_from_gemini(user_context: dict, category: Category) -> d
             else:
                 print(" All attempts failed.")
 
+    request_log.stage("gemini", time.perf_counter() - gemini_started)
+
     # 3. Fallback Check
     if not data:
         print(" Returning emergency fallback data.")
+        request_log.fallback("gemini_fallback")
         return get_fallback_response()
 
-    # 4. Metadata Enrichment (Run only if data was successfully fetched)
+    # 4. Metadata Enrichment (Started during streaming; collect the results here)
     try:
         recommendations = data.get('recommendations', [])
+        # Feeds the background cache warmer (popular titles per category/emotion)
+        recommendation_history.append(category, dominant, secondary, recommendations)
 
         if recommendations:
             with ExecutionTimer(f"Metadata Enrichment ({len(recommendations)} Items)"):
-                # Use ThreadPoolExecutor for concurrent fetching to speed up I/O-bound tasks
-                with concurrent.futures.ThreadPoolExecutor(max_workers=5) as executor:
-                    futures = [
-                        executor.submit(update_item_with_metadata, item, category)
-                        for item in recommendations
-                    ]
-                    # Wait for all futures to complete
-                    concurrent.futures.wait(futures)
+                # Most items were already submitted while streaming; submit any the incremental
+                # parser could not pick up. Anything unfinished at the deadline keeps Gemini's values.
+                enrichment_started = time.perf_counter()
+                for item in recommendations[len(batch):]:
+                    batch.submit(item)
+                data['recommendations'] = batch.wait()
+                request_log.stage("enrichment_wait", time.perf_counter() - enrichment_started)
+                if batch.unfinished:
+                    request_log.fallback("enrichment_deadline")
 
+        # Only fully enriched answers are kept for reuse under load: no skipped image validation and
+        # no items that missed the enrichment deadline (those still carry Gemini's raw values)
+        if recommendations and current_level() < SKIP_IMAGE_VALIDATION and not batch.unfinished:
+            _remember_response(category, dominant, data)
         return data
 
     except Exception as e:
@@ -0,0 +1,233 @@
+import hashlib
+import os
+import re
+import threading
+import time
+from io import BytesIO
+from pathlib import Path
+
+import requests
+
+from app.core.config import settings
+from app.utils.singleflight import SingleFlight
+
+# --- CONFIGURATION ---
+POSTER_WIDTHS = (185, 342, 500)  # Pre-resized WebP variants (TMDB-like sizes)
+DEFAULT_WIDTH = 342
+WEBP_QUALITY = 80
+FETCH_TIMEOUT = 6
+MAX_SOURCE_BYTES = 10 * 1024 * 1024  # Larger upstream images are not cached
+EVICT_TO_RATIO = 0.9  # Eviction frees space down to this share of the limit
+DISK_BLOCK_BYTES = 4096  # Files are counted at no less than one block, so the tiny .url files count too
+URL_TOUCH_INTERVAL = 3600  # A re-registered poster's .url mtime is refreshed at most this often
+CACHE_SUFFIXES = (".url", ".orig", ".webp")
+CACHE_CONTROL = "public, max-age=31536000, immutable"  # A key always maps to the same source URL
+PLACEHOLDER_HOST = "placehold.co"
+
+_KEY_RE = re.compile(r"^[0-9a-f]{32}$")
+
+
+def _disk_size(size: int) -> int:
+    return max(size, DISK_BLOCK_BYTES)
+
+
+class PosterCache:
+    """
+    On-disk poster cache behind the /posters/{key} proxy.
+    Layout: <dir>/<key[:2]>/<key>.url (source URL), <key>.orig (upstream bytes) and
+    <key>.<width>.webp (resized variants). File mtimes double as LRU access times, so several
+    worker processes can share one directory; once the total exceeds the size limit whole posters
+    (source URL included) are evicted oldest-first. Links to an evicted poster then answer 404.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._approx_bytes: int | None = None  # Scanned lazily; exact again after each eviction
+        self._fetch_flight = SingleFlight("poster-fetch")
+        self._variant_flight = SingleFlight("poster-variant")
+
+    # --- Paths ---
+    @staticmethod
+    def key_for(url: str) -> str:
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()[:32]
+
+    @staticmethod
+    def is_valid_key(key: str) -> bool:
+        return bool(_KEY_RE.match(key))
+
+    def _path(self, key: str, suffix: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.{suffix}"
+
+    def _write(self, path: Path, data: bytes):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)  # Atomic: readers never see a half-written file
+
+    # --- Registration ---
+    def public_url(self, url: str | None) -> str | None:
+        """Registers a poster URL and returns the proxy URL clients should use (placeholders pass through)."""
+        if not settings.POSTER_PROXY_ENABLED or not url or PLACEHOLDER_HOST in url:
+            return url
+        if not url.startswith(("http://", "https://")):
+            return url
+        key = self.key_for(url)
+        url_path = self._path(key, "url")
+        try:
+            registered_at = url_path.stat().st_mtime
+        except OSError:
+            encoded = url.encode("utf-8")
+            self._write(url_path, encoded)
+            self._account(_disk_size(len(encoded)))
+        else:
+            now = time.time()
+            if now - registered_at > URL_TOUCH_INTERVAL:
+                os.utime(url_path, (now, now))  # Linked again: keep it from being evicted as unused
+        return f"{settings.POSTER_PUBLIC_BASE_URL}/posters/{key}"
+
+    def remember(self, url: str, data: bytes):
+        """Stores bytes that were already downloaded (e.g. by is_valid_image) so the proxy never refetches them."""
+        if not settings.POSTER_PROXY_ENABLED or len(data) > MAX_SOURCE_BYTES:
+            return
+        key = self.key_for(url)
+        orig_path = self._path(key, "orig")
+        if orig_path.exists():
+            return
+        try:
+            encoded = url.encode("utf-8")
+            self._write(self._path(key, "url"), encoded)
+            self._write(orig_path, data)
+            self._account(_disk_size(len(encoded)) + _disk_size(len(data)))
+        except OSError as e:
+            print(f"⚠️ Poster cache write failed: {e}")
+
+    # --- Serving ---
+    def _load_original(self, key: str) -> bytes | None:
+        orig_path = self._path(key, "orig")
+        if orig_path.exists():
+            return orig_path.read_bytes()
+
+        url_path = self._path(key, "url")
+        if not url_path.exists():
+            return None
+        url = url_path.read_text(encoding="utf-8")
+
+        response = requests.get(url, timeout=FETCH_TIMEOUT, stream=True)
+        response.raise_for_status()
+        data = response.raw.read(MAX_SOURCE_BYTES + 1, decode_content=True)
+        if len(data) > MAX_SOURCE_BYTES:
+            raise ValueError(f"Poster larger than {MAX_SOURCE_BYTES} bytes: {url}")
+        self._write(orig_path, data)
+        self._account(_disk_size(len(data)))
+        return data
+
+    def _build_variants(self, key: str) -> bool:
+        from PIL import Image
+
+        data = self._fetch_flight.do(key, self._load_original, key)
+        if data is None:
+            return False
+        with Image.open(BytesIO(data)) as img:
+            img = img.convert("RGB")
+            written = 0
+            for width in POSTER_WIDTHS:
+                variant = img
+                if img.width > width:
+                    variant = img.resize((width, round(img.height * width / img.width)), Image.LANCZOS)
+                out = BytesIO()
+                variant.save(out, "WEBP", quality=WEBP_QUALITY, method=4)
+                self._write(self._path(key, f"{width}.webp"), out.getvalue())
+                written += _disk_size(out.tell())
+        self._account(written)
+        return True
+
+    def get_variant(self, key: str, width: int = DEFAULT_WIDTH) -> Path | None:
+        """
+        Returns the path of the WebP variant closest to 'width' (at or above it when possible),
+        fetching and resizing the poster on first use. None if the key is unknown.
+        """
+        width = next((w for w in POSTER_WIDTHS if w >= width), POSTER_WIDTHS[-1])
+        path = self._path(key, f"{width}.webp")
+        if not path.exists():
+            # All variants are produced together, once per key even under concurrent requests
+            if not self._variant_flight.do(key, self._build_variants, key):
+                return None
+        now = time.time()
+        try:
+            os.utime(path, (now, now))  # LRU access time
+        except OSError:
+            pass
+        return path
+
+    # --- Size bound (LRU eviction) ---
+    def _account(self, added: int):
+        with self._lock:
+            if self._approx_bytes is None:
+                self._approx_bytes = self._scan_size()
+            else:
+                self._approx_bytes += added
+            over = self._approx_bytes > self.max_bytes
+        if over:
+            self.evict()
+
+    def _cache_files(self) -> list[Path]:
+        if not self.cache_dir.exists():
+            return []
+        return [p for p in self.cache_dir.glob("*/*") if p.suffix in CACHE_SUFFIXES]
+
+    def _scan_size(self) -> int:
+        total = 0
+        for p in self._cache_files():
+            try:
+                total += _disk_size(p.stat().st_size)
+            except OSError:
+                pass
+        return total
+
+    def evict(self) -> int:
+        """Deletes least recently used posters until the cache is below EVICT_TO_RATIO of the limit."""
+        groups: dict[str, list] = {}  # key -> [last access, size, files]
+        for p in self._cache_files():
+            try:
+                stat = p.stat()
+            except OSError:
+                continue
+            group = groups.setdefault(p.name[:32], [0.0, 0, []])
+            group[0] = max(group[0], stat.st_mtime)
+            group[1] += _disk_size(stat.st_size)
+            group[2].append(p)
+
+        total = sum(g[1] for g in groups.values())
+        target = int(self.max_bytes * EVICT_TO_RATIO)
+        removed = 0
+        for last_access, size, files in sorted(groups.values(), key=lambda g: g[0]):
+            if total <= target:
+                break
+            for p in files:
+                try:
+                    p.unlink()
+                except OSError:
+                    pass
+            total -= size
+            removed += 1
+
+        with self._lock:
+            self._approx_bytes = total
+        if removed:
+            print(f"🧹 Poster cache: evicted {removed} poster(s), {total / (1024 * 1024):.1f} MB left")
+        return removed
+
+    def stats(self) -> dict:
+        with self._lock:
+            approx = self._approx_bytes
+        return {
+            "dir": str(self.cache_dir),
+            "max_mb": round(self.max_bytes / (1024 * 1024), 1),
+            "size_mb": round(approx / (1024 * 1024), 1) if approx is not None else None,
+        }
+
+
+# Shared instance: search_service hands over validated bytes, the router serves /posters/{key}
+poster_cache = PosterCache(settings.POSTER_CACHE_DIR, settings.POSTER_CACHE_MAX_MB * 1024 * 1024)
@@ -0,0 +1,256 @@
+import contextvars
+import cProfile
+import io
+import os
+import pstats
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+
+from app.core.config import settings
+
+# --- CONFIGURATION ---
+MAX_STACK_DEPTH = 128
+# Stacks whose innermost Python frame is in one of these modules are idle waits, not CPU work
+IDLE_MODULES = ("threading.py", "selectors.py", "queue.py")
+
+
+class ProfilingSession:
+    """
+    One on-demand profiling window, bounded by a request count and/or a duration.
+    While it runs:
+      * a sampler thread records the Python stack of every busy thread every PROFILE_SAMPLE_INTERVAL_MS
+        (collapsed 'frame;frame;frame count' lines, the input format of flamegraph.pl / speedscope),
+      * each profiled request runs under cProfile (merged into one pstats dump),
+      * HSEmotion forward passes of those requests run under torch.profiler (collapsed stacks by self CPU time).
+    """
+
+    def __init__(self, max_requests: int | None, max_seconds: float, with_torch: bool):
+        self.max_requests = max_requests
+        self.max_seconds = max_seconds
+        self.with_torch = with_torch
+        self.started_at = time.time()
+        self.finished_at: float | None = None
+        self.requests_started = 0
+        self.requests_done = 0
+        self.samples = 0
+        self.stacks: Counter = Counter()
+        self.torch_stacks: Counter = Counter()
+        self.torch_calls = 0
+        self._stats: pstats.Stats | None = None
+        self._inflight = 0
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._sampler = threading.Thread(target=self._sample_loop, name="profiler-sampler", daemon=True)
+
+    @property
+    def active(self) -> bool:
+        return not self._done.is_set()
+
+    # --- Lifecycle ---
+    def start(self):
+        self._sampler.start()
+
+    def stop(self):
+        with self._lock:
+            if self._done.is_set():
+                return
+            self.finished_at = time.time()
+            self._done.set()
+        print(f"🔬 Profiling finished: {self.requests_done} request(s), {self.samples} stack samples")
+
+    def _expired(self) -> bool:
+        # Caller must hold the lock
+        if time.time() - self.started_at >= self.max_seconds:
+            return True
+        return self.max_requests is not None and self.requests_done >= self.max_requests and self._inflight == 0
+
+    # --- Stack sampler ---
+    def _sample_loop(self):
+        interval = settings.PROFILE_SAMPLE_INTERVAL_MS / 1000.0
+        own_id = threading.get_ident()
+        names = {}
+        while not self._done.wait(interval):
+            with self._lock:
+                if self._expired():
+                    break
+                busy = self._inflight > 0
+            if not busy:
+                continue  # Only sample while a profiled request is running
+            if len(names) != threading.active_count():
+                names = {t.ident: t.name for t in threading.enumerate()}
+            sampled = []
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                if stack[0].split(" (", 1)[1].startswith(IDLE_MODULES):
+                    continue
+                stack.append(names.get(thread_id, f"thread-{thread_id}"))
+                sampled.append(";".join(reversed(stack)))
+            with self._lock:
+                self.stacks.update(sampled)
+                self.samples += 1
+        self.stop()
+
+    # --- Per-request profiling ---
+    def try_begin_request(self) -> bool:
+        with self._lock:
+            if self._done.is_set() or self._expired():
+                return False
+            if self.max_requests is not None and self.requests_started >= self.max_requests:
+                return False
+            self.requests_started += 1
+            self._inflight += 1
+            return True
+
+    def end_request(self, profile: cProfile.Profile | None):
+        with self._lock:
+            if profile is not None:
+                if self._stats is None:
+                    self._stats = pstats.Stats(profile)
+                else:
+                    self._stats.add(profile)
+            self._inflight -= 1
+            self.requests_done += 1
+            finished = self._expired()
+        if finished:
+            self.stop()
+
+    def add_torch_stacks(self, collapsed: str):
+        with self._lock:
+            self.torch_calls += 1
+            for line in collapsed.splitlines():
+                stack, _, value = line.rpartition(" ")
+                if stack and value.isdigit():
+                    self.torch_stacks[stack] += int(value)
+
+    # --- Results ---
+    def collapsed(self, torch: bool = False) -> str:
+        with self._lock:
+            stacks = self.torch_stacks if torch else self.stacks
+            return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+    def pstats_dump(self) -> bytes | None:
+        with self._lock:
+            if self._stats is None:
+                return None
+            with tempfile.NamedTemporaryFile(suffix=".prof", delete=False) as tmp:
+                path = tmp.name
+            try:
+                self._stats.dump_stats(path)
+                with open(path, "rb") as f:
+                    return f.read()
+            finally:
+                os.unlink(path)
+
+    def pstats_text(self, limit: int = 40) -> str:
+        with self._lock:
+            if self._stats is None:
+                return ""
+            out = io.StringIO()
+            self._stats.stream = out
+            self._stats.sort_stats("cumulative").print_stats(limit)
+            return out.getvalue()
+
+    def summary(self) -> dict:
+        with self._lock:
+            return {
+                "active": not self._done.is_set(),
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+                "max_requests": self.max_requests,
+                "max_seconds": self.max_seconds,
+                "requests_profiled": self.requests_done,
+                "requests_in_flight": self._inflight,
+                "stack_samples": self.samples,
+                "distinct_stacks": len(self.stacks),
+                "torch": self.with_torch,
+                "torch_forward_passes": self.torch_calls,
+            }
+
+
+# --- PROCESS-WIDE PROFILER ---
+_session: ProfilingSession | None = None
+_session_lock = threading.Lock()
+# Set while the current request holds a profiling slot: only its forward passes are torch-profiled
+_in_profiled_request: contextvars.ContextVar[bool] = contextvars.ContextVar("in_profiled_request", default=False)
+# torch.profiler is process-wide: concurrent profiled forward passes take turns
+_torch_profile_lock = threading.Lock()
+
+
+def start_session(max_requests: int | None, max_seconds: float, with_torch: bool) -> ProfilingSession:
+    """Starts a profiling window. Raises RuntimeError if one is already running."""
+    global _session
+    with _session_lock:
+        if _session is not None and _session.active:
+            raise RuntimeError("A profiling session is already running.")
+        _session = ProfilingSession(max_requests, min(max_seconds, settings.PROFILE_MAX_SECONDS), with_torch)
+        _session.start()
+    print(f"🔬 Profiling started: {max_requests or 'unlimited'} request(s), up to {_session.max_seconds:g}s"
+          f"{' + torch.profiler' if with_torch else ''}")
+    return _session
+
+
+def current_session() -> ProfilingSession | None:
+    return _session
+
+
+@contextmanager
+def _profiled_request(session: ProfilingSession):
+    profile = cProfile.Profile()
+    try:
+        profile.enable()
+    except ValueError:
+        profile = None  # Another thread's cProfile owns the interpreter hook (3.12+); stack samples still apply
+    token = _in_profiled_request.set(True)
+    try:
+        yield
+    finally:
+        _in_profiled_request.reset(token)
+        if profile is not None:
+            profile.disable()
+        session.end_request(profile)
+
+
+def profile_request():
+    """Context manager for one /analyze (or job) run; a no-op unless a profiling window has a free slot."""
+    session = _session
+    if session is None or not session.active or not session.try_begin_request():
+        return nullcontext()
+    return _profiled_request(session)
+
+
+@contextmanager
+def _torch_region(session: ProfilingSession):
+    import torch.profiler
+
+    with _torch_profile_lock, \
+            torch.profiler.profile(activities=[torch.profiler.ProfilerActivity.CPU], with_stack=True) as prof:
+        yield
+    with tempfile.NamedTemporaryFile(suffix=".stacks", delete=False) as tmp:
+        path = tmp.name
+    try:
+        prof.export_stacks(path, "self_cpu_time_total")
+        with open(path, encoding="utf-8") as f:
+            session.add_torch_stacks(f.read())
+    finally:
+        os.unlink(path)
+
+
+def profile_torch():
+    """
+    Context manager around an HSEmotion forward pass; a no-op unless torch profiling is on and the pass
+    belongs to a request admitted by profile_request (other requests and /ws/live frames are not profiled).
+    """
+    session = _session
+    if session is None or not session.with_torch or not session.active or not _in_profiled_request.get():
+        return nullcontext()
+    return _torch_region(session)
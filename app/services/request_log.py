@@ -0,0 +1,287 @@
+import contextvars
+import copy
+import gzip
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+from app.core.config import settings
+
+# --- CONFIGURATION ---
+QUEUE_MAX_EVENTS = 10000  # Events waiting for the writer; beyond this new events are dropped, never blocked on
+FLUSH_INTERVAL_SEC = 1.0
+FILE_PREFIX = "requests-"
+
+
+# --- PER-REQUEST EVENT ---
+class RequestEvent:
+    """
+    The structured record of one analysis. Services running on behalf of the request
+    (including enrichment worker threads, see bind()) add to it through the module functions.
+    Once closed, later updates (e.g. from enrichment items that missed the deadline) are ignored.
+    """
+
+    def __init__(self, source: str, kind: str, category: str, upload_bytes: int):
+        self._lock = threading.Lock()
+        self._closed = False
+        self.started = time.perf_counter()
+        self.record = {
+            "ts": round(time.time(), 3),
+            "id": uuid.uuid4().hex[:12],
+            "pid": os.getpid(),
+            "source": source,
+            "kind": kind,
+            "category": category,
+            "upload_bytes": upload_bytes,
+            "status": 200,
+            "stages_ms": {},
+            "cache": {},
+            "providers": {},
+            "fallbacks": [],
+        }
+
+    def set(self, **fields):
+        with self._lock:
+            if self._closed:
+                return
+            self.record.update(fields)
+
+    def stage(self, name: str, seconds: float):
+        with self._lock:
+            if self._closed:
+                return
+            stages = self.record["stages_ms"]
+            stages[name] = round(stages.get(name, 0.0) + seconds * 1000, 1)
+
+    def cache(self, name: str, hit: bool):
+        with self._lock:
+            if self._closed:
+                return
+            counts = self.record["cache"].setdefault(name, [0, 0])  # [hits, misses]
+            counts[0 if hit else 1] += 1
+
+    def provider(self, name: str, ok: bool, seconds: float):
+        with self._lock:
+            if self._closed:
+                return
+            entry = self.record["providers"].setdefault(name, {"calls": 0, "errors": 0, "ms": 0.0})
+            entry["calls"] += 1
+            entry["errors"] += 0 if ok else 1
+            entry["ms"] = round(entry["ms"] + seconds * 1000, 1)
+
+    def fallback(self, name: str):
+        with self._lock:
+            if self._closed:
+                return
+            self.record["fallbacks"].append(name)
+
+    def close(self) -> dict:
+        """Stops further updates and returns a snapshot the writer thread can serialize safely."""
+        with self._lock:
+            self._closed = True
+            return copy.deepcopy(self.record)
+
+
+_current: contextvars.ContextVar[RequestEvent | None] = contextvars.ContextVar("request_event", default=None)
+
+
+# --- RECORDING API (no-ops outside a tracked request, e.g. in the cache warmer) ---
+def note(**fields):
+    event = _current.get()
+    if event is not None:
+        event.set(**fields)
+
+
+def stage(name: str, seconds: float):
+    event = _current.get()
+    if event is not None:
+        event.stage(name, seconds)
+
+
+def cache(name: str, hit: bool):
+    event = _current.get()
+    if event is not None:
+        event.cache(name, hit)
+
+
+def provider(name: str, ok: bool, seconds: float):
+    event = _current.get()
+    if event is not None:
+        event.provider(name, ok, seconds)
+
+
+def fallback(name: str):
+    event = _current.get()
+    if event is not None:
+        event.fallback(name)
+
+
+def bind(fn):
+    """Wraps fn so it records into the calling request's event from another thread (e.g. the enrichment pool)."""
+    event = _current.get()
+    if event is None:
+        return fn
+
+    def bound(*args, **kwargs):
+        token = _current.set(event)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _current.reset(token)
+
+    return bound
+
+
+@contextmanager
+def track_request(source: str, kind: str, category: str, upload_bytes: int) -> Iterator[RequestEvent]:
+    """
+    Opens the event for one analysis and hands it to the background writer when the block exits.
+    An HTTPException's status code (or 500 for anything else) is recorded before it propagates.
+    """
+    event = RequestEvent(source, kind, category, upload_bytes)
+    token = _current.set(event)
+    try:
+        yield event
+    except Exception as e:
+        event.set(status=getattr(e, "status_code", 500), error=str(getattr(e, "detail", e))[:200])
+        raise
+    finally:
+        _current.reset(token)
+        event.stage("total", time.perf_counter() - event.started)
+        request_log_writer.emit(event.close())
+
+
+# --- BACKGROUND WRITER (size-rotated, gzip-compressed JSONL) ---
+class RequestLogWriter:
+    """
+    Appends events to <dir>/requests-<pid>.jsonl from a single background thread; request threads
+    only enqueue. Each worker process owns its file, so no cross-process locking is needed.
+    Once the active file exceeds REQUEST_LOG_MAX_MB it is gzip-compressed to
+    requests-<pid>-<timestamp>.jsonl.gz and the oldest archives beyond REQUEST_LOG_MAX_FILES are deleted.
+    """
+
+    def __init__(self, log_dir: str, max_bytes: int, max_files: int, enabled: bool):
+        self.log_dir = Path(log_dir)
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        self.enabled = enabled
+        self._queue: queue.Queue = queue.Queue(maxsize=QUEUE_MAX_EVENTS)
+        self._thread: threading.Thread | None = None
+        self._start_lock = threading.Lock()
+        self._pid: int | None = None
+        self.written = 0
+        self.dropped = 0
+
+    @property
+    def active_path(self) -> Path:
+        return self.log_dir / f"{FILE_PREFIX}{os.getpid()}.jsonl"
+
+    def _ensure_started(self):
+        # Started lazily (and again after a fork) so API workers and standalone job workers both log
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue(maxsize=QUEUE_MAX_EVENTS)
+            self._thread = threading.Thread(target=self._run, name="request-log-writer", daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+
+    def emit(self, record: dict):
+        if not self.enabled:
+            return
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def stop(self, timeout: float = 5.0):
+        """Flushes queued events and stops the writer (called from the app lifespan)."""
+        if self._thread is None or self._pid != os.getpid():
+            return
+        self._queue.put(None)
+        self._thread.join(timeout)
+        self._thread = None
+        self._pid = None
+
+    def _run(self):
+        while True:
+            try:
+                first = self._queue.get(timeout=FLUSH_INTERVAL_SEC)
+            except queue.Empty:
+                continue
+            batch = [first]
+            while len(batch) < 1000:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stopping = None in batch
+            records = [r for r in batch if r is not None]
+            if records:
+                try:
+                    self._write(records)
+                except Exception as e:
+                    print(f"⚠️ Request log write failed: {e}")
+            if stopping:
+                return
+
+    def _write(self, records: list[dict]):
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        path = self.active_path
+        lines = []
+        for r in records:
+            # One record that cannot be serialized must not cost the rest of the batch
+            try:
+                lines.append(json.dumps(r, ensure_ascii=False, separators=(",", ":")) + "\n")
+            except (TypeError, ValueError) as e:
+                self.dropped += 1
+                print(f"⚠️ Request log record skipped: {e}")
+        if not lines:
+            return
+        with open(path, "a", encoding="utf-8") as f:
+            f.write("".join(lines))
+            size = f.tell()
+        self.written += len(lines)
+        if size >= self.max_bytes:
+            self._rotate(path)
+
+    def _rotate(self, path: Path):
+        archive = path.with_name(f"{path.stem}-{time.strftime('%Y%m%d-%H%M%S')}.jsonl.gz")
+        with open(path, "rb") as src, gzip.open(archive, "wb", compresslevel=6) as dst:
+            shutil.copyfileobj(src, dst)
+        path.unlink()
+
+        archives = sorted(self.log_dir.glob(f"{FILE_PREFIX}*.jsonl.gz"), key=lambda p: p.stat().st_mtime)
+        for old in archives[:max(0, len(archives) - self.max_files)]:
+            try:
+                old.unlink()
+            except OSError:
+                pass
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "dir": str(self.log_dir),
+            "written": self.written,
+            "dropped": self.dropped,
+            "queued": self._queue.qsize(),
+        }
+
+
+# Shared instance: analysis_pipeline opens an event per /analyze or job; main.py's lifespan flushes it
+request_log_writer = RequestLogWriter(
+    settings.REQUEST_LOG_DIR,
+    int(settings.REQUEST_LOG_MAX_MB * 1024 * 1024),
+    settings.REQUEST_LOG_MAX_FILES,
+    settings.REQUEST_LOG_ENABLED,
+)
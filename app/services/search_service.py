@@ -1,19 +1,85 @@
 import requests
+import threading
 import time
 import random
 import re
 import urllib.parse
+from collections import OrderedDict
 from io import BytesIO
-from PIL import Image
-from duckduckgo_search import DDGS
 from app.core.config import settings
 from app.schemas.analysis import Category
+from app.utils.singleflight import SingleFlight
+from app.utils.circuit_breaker import ProviderHealth
+from app.services.degradation import current_level, SKIP_IMAGE_VALIDATION, SKIP_DDGS
+from app.services.poster_cache import poster_cache
+from app.services import request_log
 
 # --- CONFIGURATION ---
 PLACEHOLDER_IMG = "https://placehold.co/600x900?text=No+Image"
 TMDB_KEY = settings.TMDB_API_KEY
 FALLBACK_TIMEOUT_MIN = 1.5
 FALLBACK_TIMEOUT_MAX = 3.0
+PROVIDER_TIMEOUT = 5  # Seconds; applied to every provider HTTP call
+BREAKER_FAILURE_THRESHOLD = 3  # Consecutive failures before a provider's breaker opens
+BREAKER_RESET_TIMEOUT = 30.0  # Seconds an open breaker waits before letting a trial call through
+
+# --- SINGLE-FLIGHT GROUPS ---
+# Concurrent identical lookups (same title from several requests, same poster URL)
+# are collapsed into one outbound call whose result is shared with all waiters.
+_metadata_flight = SingleFlight("metadata")
+_provider_flight = SingleFlight("provider")
+_image_flight = SingleFlight("image")
+
+# --- METADATA CACHE (TTL + LRU; kept warm for popular titles by app/services/cache_warmer.py) ---
+METADATA_CACHE_TTL = settings.METADATA_CACHE_TTL_MINUTES * 60
+_metadata_cache: OrderedDict = OrderedDict()  # key -> (expires_at wall time, metadata)
+_metadata_cache_lock = threading.Lock()
+
+# --- PROVIDER HEALTH (Circuit Breakers + EWMA Latency/Success) ---
+PROVIDERS: dict[str, ProviderHealth] = {
+    name: ProviderHealth(name, failure_threshold=BREAKER_FAILURE_THRESHOLD, reset_timeout=BREAKER_RESET_TIMEOUT)
+    for name in ("tmdb", "itunes", "google_books", "openlibrary", "ddgs")
+}
+# Per-provider cap on simultaneous outbound calls (shared by every request in the process)
+_PROVIDER_SLOTS = {name: threading.BoundedSemaphore(settings.PROVIDER_MAX_CONCURRENCY) for name in PROVIDERS}
+
+
+def _call_provider(name: str, fn, *args):
+    """
+    Runs a provider query behind its circuit breaker and records latency/success.
+    Returns None immediately while the breaker is open, and None on any provider error.
+    """
+    health = PROVIDERS[name]
+    if not health.breaker.allow_request():
+        health.record_rejection()
+        request_log.fallback(f"{name}_circuit_open")
+        print(f"⛔ {name}: circuit open, skipping provider")
+        return None
+
+    with _PROVIDER_SLOTS[name]:
+        start = time.perf_counter()
+        try:
+            result = fn(*args)
+        except Exception as e:
+            health.record(time.perf_counter() - start, success=False)
+            request_log.provider(name, ok=False, seconds=time.perf_counter() - start)
+            print(f"⚠️ {name} provider error: {e}")
+            return None
+
+        health.record(time.perf_counter() - start, success=True)
+        request_log.provider(name, ok=True, seconds=time.perf_counter() - start)
+        return result
+
+
+def _rank_providers(names: list[str]) -> list[str]:
+    """Drops providers whose breaker is open and orders the rest by expected cost (fastest/most reliable first)."""
+    available = [n for n in names if PROVIDERS[n].breaker.state != "open"]
+    return sorted(available, key=lambda n: PROVIDERS[n].score())
+
+
+def get_provider_health() -> dict:
+    """Breaker state and EWMA stats for every provider (used by the monitoring endpoint)."""
+    return {name: health.snapshot() for name, health in PROVIDERS.items()}
 
 
 # --- UTILITY HELPERS ---
@@ -44,6 +110,10 @@ def is_valid_image(url: str) -> bool:
     """Checks if a URL points to a valid, substantial image."""
     if not url or "placehold.co" in url:
         return False
+
+    # Under load, provider URLs are trusted as-is instead of being downloaded and measured
+    if current_level() >= SKIP_IMAGE_VALIDATION:
+        return True
     
     # Trust TMDB URLs without validation (they're from a reliable API)
     if "image.tmdb.org" in url or "themoviedb.org" in url:
@@ -54,6 +124,13 @@ def is_valid_image(url: str) -> bool:
     if "books.google.com" in url and "zoom=0" not in url:
         pass
 
+    return _image_flight.do(url, _download_and_check_image, url)
+
+
+def _download_and_check_image(url: str) -> bool:
+    """Downloads the image and applies the size checks (called once per in-flight URL)."""
+    from PIL import Image
+
     try:
         response = requests.get(url, timeout=4)
         if response.status_code != 200:
@@ -69,6 +146,8 @@ def is_valid_image(url: str) -> bool:
         if len(img_data) < 2500:
             print(f"⚠️ Image file too small ({len(img_data)} bytes): {url}")
             return False
+        # Hand the bytes to the poster proxy so it never downloads this image again
+        poster_cache.remember(url, img_data)
         return True
     except Exception as e:
         print(f"⚠️ Image validation error: {e} - {url}")
@@ -77,16 +156,26 @@ def is_valid_image(url: str) -> bool:
 
 def search_image_fallback(query: str) -> str:
     """Uses DuckDuckGo Search to find an image when APIs fail."""
-    try:
-        # Avoid rapid scraping
-        time.sleep(random.uniform(FALLBACK_TIMEOUT_MIN, FALLBACK_TIMEOUT_MAX))
-        with DDGS() as ddgs:
-            results = list(ddgs.images(query, max_results=1, safesearch="off"))
-            if results:
-                return results[0]['image']
-    except Exception:
-        pass
-    return PLACEHOLDER_IMG
+    if current_level() >= SKIP_DDGS:
+        request_log.fallback("placeholder")
+        return PLACEHOLDER_IMG
+    request_log.fallback("ddgs")
+    image_url = _call_provider("ddgs", _query_ddgs_image, query)
+    if not image_url:
+        request_log.fallback("placeholder")
+    return image_url if image_url else PLACEHOLDER_IMG
+
+
+def _query_ddgs_image(query: str) -> str | None:
+    from duckduckgo_search import DDGS
+
+    # Avoid rapid scraping
+    time.sleep(random.uniform(FALLBACK_TIMEOUT_MIN, FALLBACK_TIMEOUT_MAX))
+    with DDGS(timeout=PROVIDER_TIMEOUT) as ddgs:
+        results = list(ddgs.images(query, max_results=1, safesearch="off"))
+        if results:
+            return results[0]['image']
+    return None
 
 
 # --- LOW-LEVEL API FETCHERS ---
@@ -95,147 +184,178 @@ def _fetch_tmdb_metadata(query: str, content_type: str) -> dict | None:
     if not TMDB_KEY:
         print("⚠️ TMDB API Key not configured")
         return None
+    return _provider_flight.do(
+        ("tmdb", content_type, query), _call_provider, "tmdb", _query_tmdb, query, content_type
+    )
+
 
+def _query_tmdb(query: str, content_type: str) -> dict | None:
     clean_query = clean_query_for_api(query)
     url = f"https://api.themoviedb.org/3/search/{content_type}"
     params = {"api_key": TMDB_KEY, "query": clean_query, "language": "tr-TR"}
 
-    try:
-        res = requests.get(url, params=params, timeout=5).json()
-        results = res.get('results', [])
-        if not results:
-            print(f"⚠️ TMDB: No results found for '{query}' (cleaned: '{clean_query}')")
-            return None
-
-        # Select the best match based on vote count
-        best_match = max(results, key=lambda x: x.get('vote_count', 0))
-        print(f"✓ TMDB found: {best_match.get('title') or best_match.get('name', 'Unknown')} (votes: {best_match.get('vote_count', 0)})")
+    response = requests.get(url, params=params, timeout=PROVIDER_TIMEOUT)
+    response.raise_for_status()
+    res = response.json()
+    results = res.get('results', [])
+    if not results:
+        print(f"⚠️ TMDB: No results found for '{query}' (cleaned: '{clean_query}')")
+        return None
 
-        # Poster URL construction
-        poster = PLACEHOLDER_IMG
-        if best_match.get('poster_path'):
-            poster = f"https://image.tmdb.org/t/p/w500{best_match['poster_path']}"
-            print(f"✓ Poster path found: {best_match['poster_path']}")
+    # Select the best match based on vote count
+    best_match = max(results, key=lambda x: x.get('vote_count', 0))
+    print(f"✓ TMDB found: {best_match.get('title') or best_match.get('name', 'Unknown')} (votes: {best_match.get('vote_count', 0)})")
+
+    # Poster URL construction
+    poster = PLACEHOLDER_IMG
+    if best_match.get('poster_path'):
+        poster = f"https://image.tmdb.org/t/p/w500{best_match['poster_path']}"
+        print(f"✓ Poster path found: {best_match['poster_path']}")
+    else:
+        print(f"⚠️ No poster_path in TMDB response for '{query}'")
+
+    # Extract year (only if valid)
+    date_field = 'release_date' if content_type == 'movie' else 'first_air_date'
+    year_str = best_match.get(date_field, "")
+    year = year_str[:4] if year_str and len(year_str) >= 4 else None
+
+    # Extract overview (handle empty strings)
+    overview = best_match.get('overview', "").strip()
+    if not overview:
+        overview = None  # Return None instead of empty string, so Gemini's value can be used
+    elif len(overview) > 350:
+        # Truncate if too long
+        last_dot = overview[:350].rfind('.')
+        if last_dot != -1:
+            overview = overview[:last_dot + 1]
         else:
-            print(f"⚠️ No poster_path in TMDB response for '{query}'")
-
-        # Extract year (only if valid)
-        date_field = 'release_date' if content_type == 'movie' else 'first_air_date'
-        year_str = best_match.get(date_field, "")
-        year = year_str[:4] if year_str and len(year_str) >= 4 else None
-
-        # Extract overview (handle empty strings)
-        overview = best_match.get('overview', "").strip()
-        if not overview:
-            overview = None  # Return None instead of empty string, so Gemini's value can be used
-        elif len(overview) > 350:
-            # Truncate if too long
-            last_dot = overview[:350].rfind('.')
-            if last_dot != -1:
-                overview = overview[:last_dot + 1]
-            else:
-                overview = overview[:350] + "..."
-
-        # Extract rating
-        vote_average = best_match.get('vote_average', 0)
-        rating = f"{vote_average:.1f}/10" if vote_average > 0 else None
-
-        return {
-            "poster": poster,
-            "overview": overview,
-            "rating": rating,
-            "year": year
-        }
-    except Exception as e:
-        print(f"⚠️ TMDB API Error for '{query}': {e}")
-        return None
+            overview = overview[:350] + "..."
 
+    # Extract rating
+    vote_average = best_match.get('vote_average', 0)
+    rating = f"{vote_average:.1f}/10" if vote_average > 0 else None
 
-def _fetch_itunes_full_metadata(query: str) -> dict | None:
-    """Fetches full music metadata (links, artwork) from iTunes."""
+    return {
+        "poster": poster,
+        "overview": overview,
+        "rating": rating,
+        "year": year
+    }
+
+
+def _itunes_search(query: str) -> dict | None:
+    """Returns the first iTunes music result for a query (shared by all iTunes fetchers)."""
+    return _provider_flight.do(("itunes", query), _call_provider, "itunes", _query_itunes, query)
+
+
+def _query_itunes(query: str) -> dict | None:
     url = "https://itunes.apple.com/search"
     params = {"term": query, "media": "music", "limit": 1}
-    try:
-        res = requests.get(url, params=params).json()
-        if res['resultCount'] > 0:
-            item = res['results'][0]
-            # Replace 100x100 artwork with high-res 600x600
-            artwork = item.get('artworkUrl100', '').replace('100x100', '600x600')
-            artist = item.get('artistName', '')
-            track = item.get('trackName', '')
-            apple_link = item.get('trackViewUrl')
-            links = generate_music_links(artist, track, apple_link)
-            return {
-                "poster": artwork,
-                "external_links": links,
-                "overview": None,
-                "rating": None,
-                "year": None
-            }
-    except:
-        pass
+    response = requests.get(url, params=params, timeout=PROVIDER_TIMEOUT)
+    response.raise_for_status()
+    res = response.json()
+    if res['resultCount'] > 0:
+        return res['results'][0]
     return None
 
 
+def _fetch_itunes_full_metadata(query: str) -> dict | None:
+    """Fetches full music metadata (links, artwork) from iTunes."""
+    item = _itunes_search(query)
+    if not item:
+        return None
+    # Replace 100x100 artwork with high-res 600x600
+    artwork = item.get('artworkUrl100', '').replace('100x100', '600x600')
+    artist = item.get('artistName', '')
+    track = item.get('trackName', '')
+    apple_link = item.get('trackViewUrl')
+    links = generate_music_links(artist, track, apple_link)
+    return {
+        "poster": artwork,
+        "external_links": links,
+        "overview": None,
+        "rating": None,
+        "year": None
+    }
+
+
 def _fetch_book_poster_google(query: str) -> str | None:
     """Fetches book cover URL from Google Books API."""
+    return _provider_flight.do(
+        ("google_books", query), _call_provider, "google_books", _query_google_books, query
+    )
+
+
+def _query_google_books(query: str) -> str | None:
     url = "https://www.googleapis.com/books/v1/volumes"
     params = {"q": query, "maxResults": 1}
-    try:
-        res = requests.get(url, params=params).json()
-        if 'items' in res:
-            links = res['items'][0]['volumeInfo'].get('imageLinks', {})
-            best = links.get('extraLarge') or links.get('large') or links.get('medium') or links.get('thumbnail')
-            if best:
-                # Cleanup and standardization
-                best = best.replace("http://", "https://")
-                best = re.sub(r'&zoom=\d', '&zoom=0', best)
-                return best.replace("&edge=curl", "")
-    except:
-        pass
+    response = requests.get(url, params=params, timeout=PROVIDER_TIMEOUT)
+    response.raise_for_status()
+    res = response.json()
+    if 'items' in res:
+        links = res['items'][0]['volumeInfo'].get('imageLinks', {})
+        best = links.get('extraLarge') or links.get('large') or links.get('medium') or links.get('thumbnail')
+        if best:
+            # Cleanup and standardization
+            best = best.replace("http://", "https://")
+            best = re.sub(r'&zoom=\d', '&zoom=0', best)
+            return best.replace("&edge=curl", "")
     return None
 
 
 def _fetch_book_poster_openlibrary(title: str, creator: str) -> str | None:
     """Fetches book cover URL from Open Library API."""
+    return _provider_flight.do(
+        ("openlibrary", title, creator), _call_provider, "openlibrary", _query_openlibrary, title, creator
+    )
+
+
+def _query_openlibrary(title: str, creator: str) -> str | None:
     cleaned_title = clean_query_for_api(title)
     search_url = "https://openlibrary.org/search.json"
     params = {"q": f"{cleaned_title} {creator}", "limit": 1}
-    try:
-        res = requests.get(search_url, params=params, timeout=5).json()
-        if res.get('docs') and res['docs'][0].get('cover_i'):
-            return f"https://covers.openlibrary.org/b/id/{res['docs'][0]['cover_i']}-L.jpg"
-    except:
-        pass
+    response = requests.get(search_url, params=params, timeout=PROVIDER_TIMEOUT)
+    response.raise_for_status()
+    res = response.json()
+    if res.get('docs') and res['docs'][0].get('cover_i'):
+        return f"https://covers.openlibrary.org/b/id/{res['docs'][0]['cover_i']}-L.jpg"
     return None
 
 
 def _fetch_music_poster_itunes(query: str) -> str | None:
     """Fetches music artwork URL from iTunes API (poster only)."""
-    url = "https://itunes.apple.com/search"
-    params = {"term": query, "media": "music", "limit": 1}
-    try:
-        res = requests.get(url, params=params).json()
-        if res['resultCount'] > 0:
-            # High-res version of artwork
-            return res['results'][0].get('artworkUrl100', '').replace('100x100bb', '600x600bb')
-    except:
-        pass
+    item = _itunes_search(query)
+    if item:
+        # High-res version of artwork
+        return item.get('artworkUrl100', '').replace('100x100bb', '600x600bb')
     return None
 
 
+# Book cover providers, keyed by provider name (order is decided at runtime by _rank_providers)
+BOOK_POSTER_FETCHERS = {
+    "google_books": lambda title, creator: _fetch_book_poster_google(title),
+    "openlibrary": _fetch_book_poster_openlibrary,
+}
+
+
 # --- POSTER RESOLVER ---
-def get_poster_url(title: str, creator: str, category: Category) -> str:
-    """Attempts to find the best poster URL using API fallbacks and scraping."""
+def get_poster_url(title: str, creator: str, category: Category, skip_api: bool = False) -> str:
+    """
+    Attempts to find the best poster URL using API fallbacks and scraping.
+    Pass skip_api=True when the caller already queried the category's API without success.
+    """
     image_url = None
 
     try:
-        if category == Category.BOOK:
-            # 1. Try Google Books
-            image_url = _fetch_book_poster_google(title)
-            # 2. Try Open Library if Google fails or image is invalid
-            if not image_url or not is_valid_image(image_url):
-                image_url = _fetch_book_poster_openlibrary(title, creator)
+        if skip_api:
+            pass
+        elif category == Category.BOOK:
+            # Try the book providers, healthiest first; open breakers are skipped entirely
+            for provider in _rank_providers(list(BOOK_POSTER_FETCHERS)):
+                image_url = BOOK_POSTER_FETCHERS[provider](title, creator)
+                if image_url and is_valid_image(image_url):
+                    break
+                image_url = None
         elif category == Category.MUSIC:
             image_url = _fetch_music_poster_itunes(f"{title} {creator}")
     except Exception:
@@ -250,8 +370,56 @@ def get_poster_url(title: str, creator: str, category: Category) -> str:
 
 
 # --- MAIN FUNCTION: METADATA COLLECTOR ---
+def _metadata_key(title: str, creator: str, category: Category) -> tuple:
+    return category.value, (title or "").strip().lower(), (creator or "").strip().lower()
+
+
 def get_content_metadata(title: str, creator: str, category: Category) -> dict:
-    """Collects comprehensive metadata for a piece of content."""
+    """Collects comprehensive metadata for a piece of content (served from the TTL cache when fresh)."""
+    key = _metadata_key(title, creator, category)
+    with _metadata_cache_lock:
+        entry = _metadata_cache.get(key)
+        if entry is not None and entry[0] > time.time():
+            _metadata_cache.move_to_end(key)
+            request_log.cache("metadata", hit=True)
+            return dict(entry[1])
+
+    request_log.cache("metadata", hit=False)
+    metadata = _metadata_flight.do(key, _collect_and_cache, key, title, creator, category)
+    # Waiters share the leader's dict; hand every caller its own copy
+    return dict(metadata)
+
+
+def refresh_content_metadata(title: str, creator: str, category: Category) -> dict:
+    """Re-resolves a title through the providers regardless of the cache and stores the result."""
+    key = _metadata_key(title, creator, category)
+    return dict(_metadata_flight.do(key, _collect_and_cache, key, title, creator, category))
+
+
+def get_metadata_expiry(title: str, creator: str, category: Category) -> float | None:
+    """Wall time at which the cached entry expires, or None if the title is not cached."""
+    with _metadata_cache_lock:
+        entry = _metadata_cache.get(_metadata_key(title, creator, category))
+    return entry[0] if entry is not None else None
+
+
+def _collect_and_cache(key: tuple, title: str, creator: str, category: Category) -> dict:
+    degraded = current_level() >= SKIP_IMAGE_VALIDATION
+    metadata = _collect_content_metadata(title, creator, category)
+
+    # Only cache complete answers: nothing found (e.g. providers down) or shortcuts taken under load
+    # would otherwise be served for the whole TTL
+    found = metadata["poster"] != PLACEHOLDER_IMG or metadata["overview"] or metadata["rating"]
+    if found and not degraded:
+        with _metadata_cache_lock:
+            _metadata_cache[key] = (time.time() + METADATA_CACHE_TTL, metadata)
+            _metadata_cache.move_to_end(key)
+            while len(_metadata_cache) > settings.METADATA_CACHE_MAX_ENTRIES:
+                _metadata_cache.popitem(last=False)
+    return metadata
+
+
+def _collect_content_metadata(title: str, creator: str, category: Category) -> dict:
     print(f"\n🔍 Fetching metadata for: '{title}' ({category.value})")
     
     metadata = {
@@ -284,8 +452,9 @@ def get_content_metadata(title: str, creator: str, category: Category) -> dict:
             if itunes_data:
                 metadata.update(itunes_data)
             else:
-                # Fetch poster and basic links if full iTunes data is missing
-                metadata["poster"] = get_poster_url(title, creator, category)
+                # Fetch poster and basic links if full iTunes data is missing.
+                # iTunes already answered empty for this query, so skip straight to scraping.
+                metadata["poster"] = get_poster_url(title, creator, category, skip_api=True)
                 metadata["external_links"] = generate_music_links(creator, title)
 
         elif category == Category.BOOK:
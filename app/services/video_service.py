@@ -0,0 +1,187 @@
+import os
+import tempfile
+from io import BytesIO
+from typing import Iterator, Tuple
+
+import cv2
+import numpy as np
+
+from app.core.models import EMOTION_CLASSES, get_emotion_recognizer
+from app.services.degradation import current_level, FAST_DETECTOR, SKIP_DEMOGRAPHY
+from app.services.face_backend import analyze_demography, detect_face
+from app.services.profiler import profile_torch
+from app.services import request_log
+from app.services.vision_service import calculate_custom_emotion, get_secondary_emotion
+from app.utils.timer import ExecutionTimer
+
+# --- CONFIGURATION (hard limits so a long or huge clip cannot exhaust a worker) ---
+MAX_DECODED_FRAMES = 900  # Stop decoding after this many frames
+MAX_CLIP_SECONDS = 30.0  # Ignore everything after this timestamp
+MAX_SAMPLED_FRAMES = 24  # Upper bound on frames sent to face detection / HSEmotion
+MAX_SOURCE_PIXELS = 4096 * 2160  # Reject clips whose frames are larger than 4K
+MAX_FRAME_DIM = 640  # Decoded frames are downscaled right away to bound memory
+SAMPLE_STRIDE_SEC = 1.0  # Fixed-stride sampling interval
+SCENE_CHANGE_THRESHOLD = 18.0  # Mean abs diff (0-255) of 32x32 thumbnails that counts as a cut
+EMOTION_BATCH_SIZE = 16  # Face crops per HSEmotion forward pass
+DEFAULT_GIF_FRAME_MS = 100
+
+
+# --- STREAMING FRAME DECODERS ---
+def _downscale(frame: np.ndarray) -> np.ndarray:
+    h, w = frame.shape[:2]
+    scale = MAX_FRAME_DIM / max(h, w)
+    if scale < 1.0:
+        frame = cv2.resize(frame, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
+    return frame
+
+
+def _iter_gif_frames(data: bytes | memoryview) -> Iterator[Tuple[np.ndarray, float]]:
+    """Yields (BGR frame, timestamp sec) one frame at a time; PIL decodes lazily."""
+    from PIL import Image, ImageSequence
+
+    with Image.open(BytesIO(data)) as gif:
+        if gif.width * gif.height > MAX_SOURCE_PIXELS:
+            raise ValueError(f"GIF too large ({gif.width}x{gif.height})")
+        timestamp = 0.0
+        for frame in ImageSequence.Iterator(gif):
+            rgb = np.asarray(frame.convert("RGB"))
+            yield _downscale(cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR)), timestamp
+            timestamp += (frame.info.get("duration") or DEFAULT_GIF_FRAME_MS) / 1000.0
+
+
+def _iter_video_frames(data: bytes | memoryview) -> Iterator[Tuple[np.ndarray, float]]:
+    """Yields (BGR frame, timestamp sec) one frame at a time using OpenCV's decoder."""
+    # cv2.VideoCapture needs a path; the temp file is removed as soon as decoding ends
+    tmp = tempfile.NamedTemporaryFile(suffix=".video", delete=False)
+    try:
+        tmp.write(data)
+        tmp.close()
+        cap = cv2.VideoCapture(tmp.name)
+        if not cap.isOpened():
+            raise ValueError("Video could not be opened")
+        try:
+            width = cap.get(cv2.CAP_PROP_FRAME_WIDTH)
+            height = cap.get(cv2.CAP_PROP_FRAME_HEIGHT)
+            if width * height > MAX_SOURCE_PIXELS:
+                raise ValueError(f"Video too large ({int(width)}x{int(height)})")
+            fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+            index = 0
+            while True:
+                ok, frame = cap.read()
+                if not ok:
+                    break
+                yield _downscale(frame), index / fps
+                index += 1
+        finally:
+            cap.release()
+    finally:
+        os.unlink(tmp.name)
+
+
+# --- ADAPTIVE SAMPLING ---
+def sample_frames(frames: Iterator[Tuple[np.ndarray, float]]) -> Tuple[list, float]:
+    """
+    Picks frames at scene changes or every SAMPLE_STRIDE_SEC, whichever comes first.
+    Returns ([(frame, timestamp), ...], clip end timestamp). Only sampled frames are kept in memory.
+    """
+    samples = []
+    prev_thumb = None
+    last_sample_t = None
+    end_t = 0.0
+
+    for decoded, (frame, t) in enumerate(frames, start=1):
+        if decoded > MAX_DECODED_FRAMES or t > MAX_CLIP_SECONDS:
+            break
+        end_t = t
+
+        thumb = cv2.resize(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), (32, 32)).astype(np.float32)
+        scene_change = prev_thumb is not None and float(np.mean(np.abs(thumb - prev_thumb))) > SCENE_CHANGE_THRESHOLD
+        stride_due = last_sample_t is None or t - last_sample_t >= SAMPLE_STRIDE_SEC
+        prev_thumb = thumb
+
+        if scene_change or stride_due:
+            samples.append((frame, t))
+            last_sample_t = t
+            if len(samples) >= MAX_SAMPLED_FRAMES:
+                break
+
+    return samples, end_t
+
+
+# --- MAIN ANALYSIS FUNCTION ---
+def analyze_video_with_smart_ai(data: bytes | memoryview, kind: str) -> dict | None:
+    """
+    Analyses a short clip or animated GIF: samples frames, batches the face crops through HSEmotion
+    and aggregates a time-weighted emotional profile. Demography runs once on the largest face.
+    Returns the same structure as analyze_image_with_smart_ai.
+    """
+    with ExecutionTimer(f"Video Analysis Pipeline ({kind})"):
+        try:
+            frames = _iter_gif_frames(data) if kind == "gif" else _iter_video_frames(data)
+            samples, end_t = sample_frames(frames)
+            if not samples:
+                return None
+
+            # 1. Face detection on sampled frames (cheap detector)
+            crops, timestamps = [], []
+            best_frame, best_area = None, 0
+            for frame, t in samples:
+                box = detect_face(frame, fast=True)
+                if box is None:
+                    continue
+                x, y, w, h = box
+                face_img = frame[max(y, 0):y + h, max(x, 0):x + w]
+                if face_img.size == 0:
+                    continue
+
+                crops.append(cv2.cvtColor(cv2.resize(face_img, (224, 224)), cv2.COLOR_BGR2RGB))
+                timestamps.append(t)
+                if w * h > best_area:
+                    best_frame, best_area = frame, w * h
+
+            h, w = samples[0][0].shape[:2]
+            request_log.note(image_width=w, image_height=h, frames=len(samples), faces=len(crops))
+            if not crops:
+                return None
+
+            # 2. Batched HSEmotion inference
+            recognizer = get_emotion_recognizer()
+            score_batches = []
+            for i in range(0, len(crops), EMOTION_BATCH_SIZE):
+                with profile_torch():
+                    _, scores = recognizer.predict_multi_emotions(crops[i:i + EMOTION_BATCH_SIZE], logits=False)
+                score_batches.append(np.asarray(scores))
+            all_scores = np.concatenate(score_batches)
+
+            # 3. Time-weighted aggregation: each sample stands for the time until the next one
+            bounds = timestamps[1:] + [max(end_t, timestamps[-1])]
+            weights = np.array([max(b - t, 1e-3) for t, b in zip(timestamps, bounds)])
+            profile = (all_scores * weights[:, None]).sum(axis=0) / weights.sum()
+
+            dominant_emotion, adjusted_score_dict = calculate_custom_emotion(profile)
+            raw_score_dict_full = {EMOTION_CLASSES[i]: float(profile[i]) for i in range(len(profile))}
+            secondary_emotion = get_secondary_emotion(raw_score_dict_full, dominant_emotion)
+
+            # 4. Demography once, on the frame with the largest face (skipped under heavy load)
+            level = current_level()
+            if level >= SKIP_DEMOGRAPHY:
+                demography = {"age": None, "gender": "Unknown"}
+            else:
+                demography = analyze_demography(best_frame, fast=level >= FAST_DETECTOR)
+
+            print(f" Video profile from {len(crops)}/{len(samples)} sampled frames over {end_t:.1f}s")
+            return {
+                "emotion": dominant_emotion,
+                "secondary_emotion": secondary_emotion,
+                "age": int(demography['age']) if demography['age'] is not None else None,
+                "gender": demography['gender'],
+                "raw_emotion_scores": dict(sorted(
+                    adjusted_score_dict.items(),
+                    key=lambda item: item[1],
+                    reverse=True
+                ))
+            }
+
+        except Exception as e:
+            print(f" Video analysis error: {e}")
+            return None
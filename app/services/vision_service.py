@@ -1,9 +1,15 @@
 import cv2
 import numpy as np
-from deepface import DeepFace
-from app.core.models import THRESHOLDS, EMOTION_CLASSES, emotion_recognizer
+from app.core.models import THRESHOLDS, EMOTION_CLASSES, get_emotion_recognizer
+from app.services.degradation import current_level, FAST_DETECTOR, SKIP_DEMOGRAPHY
+from app.services.face_backend import analyze_demography, detect_face
+from app.services.profiler import profile_torch
+from app.services import request_log
 from app.utils.timer import ExecutionTimer
 
+# --- CONFIGURATION ---
+LIVE_DETECT_WIDTH = 480  # Live frames wider than this are downscaled for detection only
+
 
 # --- HELPER FUNCTIONS ---
 def get_secondary_emotion(scores: dict, dominant: str) -> str:
@@ -63,39 +69,57 @@ def calculate_custom_emotion(raw_scores: np.ndarray) -> tuple[str, dict]:
     return best_emotion, final_scores
 
 
+def predict_face_emotions(img: np.ndarray, box: tuple[int, int, int, int]) -> np.ndarray | None:
+    """Runs HSEmotion on the face region of a BGR image and returns the raw probability vector."""
+    recognizer = get_emotion_recognizer()
+    if recognizer is None:
+        return None
+
+    x, y, w, h = box
+    face_img = img[max(y, 0):y + h, max(x, 0):x + w]
+    if face_img.size == 0:
+        return None
+
+    face_img = cv2.resize(face_img, (224, 224))
+    face_img_rgb = cv2.cvtColor(face_img, cv2.COLOR_BGR2RGB)
+    with profile_torch():
+        _, raw_scores = recognizer.predict_emotions(face_img_rgb, logits=False)
+    return raw_scores
+
+
 # --- MAIN ANALYSIS FUNCTION ---
-def analyze_image_with_smart_ai(image_bytes: bytes) -> dict | None:
+def analyze_image_with_smart_ai(image_bytes: bytes | memoryview) -> dict | None:
     """Performs multi-step analysis (Demography + Custom Emotion Scoring) on an image."""
     with ExecutionTimer("Vision Analysis Pipeline"):
         try:
-            # Decode Image
+            # Decode Image (np.frombuffer wraps the upload buffer without copying it)
             nparr = np.frombuffer(image_bytes, np.uint8)
             img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-
-            # DeepFace Demography Analysis (Age, Gender, Face Region)
-            demography_objs = DeepFace.analyze(
-                img_path=img,
-                actions=['age', 'gender'],
-                detector_backend='retinaface',
-                enforce_detection=False,
-                silent=True
-            )
-            demography = demography_objs[0]
-
-            region = demography['region']
-            x, y, w, h = region['x'], region['y'], region['w'], region['h']
-
-            # Prepare Face Image for Emotion Recognition
-            face_img = img[y:y + h, x:x + w]
-            if face_img.size == 0:
+            img_h, img_w = img.shape[:2]
+            request_log.note(image_width=img_w, image_height=img_h)
+
+            # Demography Analysis (Age, Gender, Face Region) with the active vision profile.
+            # Under load: cheaper detector first, then face detection only (age/gender unknown)
+            level = current_level()
+            if level >= SKIP_DEMOGRAPHY:
+                box = detect_face(img, fast=True)
+                if box is None:
+                    request_log.fallback("whole_image_face")
+                    box = (0, 0, img_w, img_h)
+                x, y, w, h = box
+                demography = {"age": None, "gender": "Unknown"}
+            else:
+                demography = analyze_demography(img, fast=level >= FAST_DETECTOR)
+                region = demography['region']
+                x, y, w, h = region['x'], region['y'], region['w'], region['h']
+            # The backends fall back to the whole image when no face is found
+            request_log.note(faces=0 if (w, h) == (img_w, img_h) else 1)
+
+            # HSEmotion Prediction on the face region
+            raw_scores = predict_face_emotions(img, (x, y, w, h))
+            if raw_scores is None:
                 return None
 
-            face_img = cv2.resize(face_img, (224, 224))
-            face_img_rgb = cv2.cvtColor(face_img, cv2.COLOR_BGR2RGB)
-
-            # HSEmotion Prediction
-            _, raw_scores = emotion_recognizer.predict_emotions(face_img_rgb, logits=False)
-
             # Custom Emotion Scoring
             dominant_emotion, adjusted_score_dict = calculate_custom_emotion(raw_scores)
 
@@ -107,8 +131,8 @@ def analyze_image_with_smart_ai(image_bytes: bytes) -> dict | None:
             return {
                 "emotion": dominant_emotion,
                 "secondary_emotion": secondary_emotion,
-                "age": int(demography['age']),
-                "gender": demography['dominant_gender'],
+                "age": int(demography['age']) if demography['age'] is not None else None,
+                "gender": demography['gender'],
                 "raw_emotion_scores": dict(sorted(
                     adjusted_score_dict.items(),
                     key=lambda item: item[1],
@@ -117,4 +141,28 @@ def analyze_image_with_smart_ai(image_bytes: bytes) -> dict | None:
             }
 
         except Exception:
-            return None
\ No newline at end of file
+            return None
+
+
+# --- LIVE STREAM ANALYSIS ---
+def analyze_live_frame(img: np.ndarray) -> tuple[np.ndarray, tuple[int, int, int, int]] | None:
+    """
+    Fast path for live streams: fast face detection + HSEmotion, no demography.
+    Returns (raw emotion probabilities, face box in original frame coordinates) or None if no face.
+    """
+    if get_emotion_recognizer() is None:
+        return None
+
+    scale = min(1.0, LIVE_DETECT_WIDTH / img.shape[1])
+    small = cv2.resize(img, (0, 0), fx=scale, fy=scale) if scale < 1.0 else img
+
+    small_box = detect_face(small, fast=True)
+    if small_box is None:
+        return None
+
+    box = tuple(int(v / scale) for v in small_box)
+
+    raw_scores = predict_face_emotions(img, box)
+    if raw_scores is None:
+        return None
+    return raw_scores, box
@@ -0,0 +1,128 @@
+import threading
+import time
+
+
+class CircuitBreaker:
+    """
+    Classic three-state circuit breaker.
+    CLOSED: calls pass through, consecutive failures are counted.
+    OPEN: calls are rejected immediately until 'reset_timeout' has passed.
+    HALF_OPEN: a single trial call is let through; success closes the breaker, failure re-opens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._refresh_state()
+            return self._state
+
+    def _refresh_state(self):
+        # Caller must hold the lock
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+            self._trial_in_flight = False
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            self._refresh_state()
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._trial_in_flight = False
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            self._refresh_state()
+            retry_in = 0.0
+            if self._state == self.OPEN:
+                retry_in = max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+            return {
+                "state": self._state,
+                "consecutive_failures": self._failures,
+                "retry_in_sec": round(retry_in, 2),
+            }
+
+
+class ProviderHealth:
+    """
+    Tracks an exponentially weighted moving average (EWMA) of latency and success rate
+    for one upstream provider, together with its circuit breaker.
+    """
+
+    def __init__(self, name: str, alpha: float = 0.3, failure_threshold: int = 3, reset_timeout: float = 30.0):
+        self.name = name
+        self.alpha = alpha
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self._lock = threading.Lock()
+        self.ewma_latency: float | None = None
+        self.ewma_success = 1.0
+        self.calls = 0
+        self.failures = 0
+        self.rejected = 0
+
+    def record(self, latency: float, success: bool):
+        with self._lock:
+            self.calls += 1
+            if not success:
+                self.failures += 1
+            if self.ewma_latency is None:
+                self.ewma_latency = latency
+            else:
+                self.ewma_latency = self.alpha * latency + (1 - self.alpha) * self.ewma_latency
+            self.ewma_success = self.alpha * (1.0 if success else 0.0) + (1 - self.alpha) * self.ewma_success
+
+        if success:
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure()
+
+    def record_rejection(self):
+        with self._lock:
+            self.rejected += 1
+
+    def score(self) -> float:
+        """Expected cost of a useful answer: lower is better. Unknown providers score optimistically."""
+        with self._lock:
+            latency = self.ewma_latency if self.ewma_latency is not None else 0.0
+            return latency / max(self.ewma_success, 0.05)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            stats = {
+                "ewma_latency_ms": round(self.ewma_latency * 1000, 1) if self.ewma_latency is not None else None,
+                "ewma_success_rate": round(self.ewma_success, 3),
+                "calls": self.calls,
+                "failures": self.failures,
+                "rejected": self.rejected,
+            }
+        stats["breaker"] = self.breaker.snapshot()
+        return stats
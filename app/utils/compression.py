@@ -0,0 +1,125 @@
+import gzip
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli  # Optional: 'pip install brotli' enables br responses
+except ImportError:
+    brotli = None
+
+# --- CONFIGURATION ---
+# Posters (WebP) and other binary media are already compressed; only text formats are worth the CPU
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "image/svg+xml")
+# Bodies arriving in several chunks (e.g. re-streamed by an @app.middleware("http") function) are
+# collected up to this size and compressed as a whole; longer streams are sent uncompressed
+MAX_BUFFER_BYTES = 1024 * 1024
+
+
+def _accepted(accept_encoding: str) -> dict[str, float]:
+    """Parses Accept-Encoding into {coding: q}."""
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def negotiate_encoding(accept_encoding: str, available: tuple[str, ...] = ("br", "gzip")) -> str | None:
+    """
+    Picks the content coding to use for a response: br before gzip at equal preference,
+    only codings the server can produce (br needs the brotli package), None for identity.
+    """
+    accepted = _accepted(accept_encoding)
+    best, best_q = None, 0.0
+    for coding in available:
+        if coding == "br" and brotli is None:
+            continue
+        q = accepted.get(coding, accepted.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def compress(body: bytes, coding: str, level: int) -> bytes:
+    """level: gzip 1-9, brotli quality 0-11."""
+    if coding == "br":
+        return brotli.compress(body, quality=level)
+    return gzip.compress(body, compresslevel=level, mtime=0)
+
+
+class CompressionMiddleware:
+    """
+    Negotiated br/gzip compression for text responses such as the JSON API answers.
+    Binary media (posters), small bodies, long streams and responses that already carry a
+    Content-Encoding (e.g. the precompressed status page) pass through untouched.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 500, gzip_level: int = 6, brotli_quality: int = 5):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.levels = {"gzip": gzip_level, "br": brotli_quality}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        coding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if coding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Message | None = None
+        chunks: list[bytes] = []
+        buffered = 0
+        passthrough = False
+
+        async def send_compressed(message: Message):
+            nonlocal start, buffered, passthrough
+            if message["type"] == "http.response.start":
+                start = message
+                headers = Headers(raw=message["headers"])
+                content_type = headers.get("content-type", "")
+                passthrough = ("content-encoding" in headers
+                               or not content_type.startswith(COMPRESSIBLE_TYPES)
+                               or content_type.startswith("text/event-stream"))
+                if passthrough:
+                    await send(message)
+                return
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            chunks.append(body)
+            buffered += len(body)
+            if message.get("more_body", False):
+                if buffered <= MAX_BUFFER_BYTES:
+                    return
+                # Too long to buffer: stream the rest uncompressed
+                passthrough = True
+                MutableHeaders(raw=start["headers"]).add_vary_header("Accept-Encoding")
+                await send(start)
+                await send({"type": "http.response.body", "body": b"".join(chunks), "more_body": True})
+                return
+
+            body = b"".join(chunks)
+            headers = MutableHeaders(raw=start["headers"])
+            headers.add_vary_header("Accept-Encoding")
+            if len(body) >= self.minimum_size:
+                body = compress(body, coding, self.levels[coding])
+                headers["Content-Encoding"] = coding
+                headers["Content-Length"] = str(len(body))
+            await send(start)
+            await send({"type": "http.response.body", "body": body, "more_body": False})
+
+        await self.app(scope, receive, send_compressed)
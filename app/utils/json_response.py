@@ -0,0 +1,20 @@
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if orjson is not None:
+    from fastapi.responses import ORJSONResponse as DefaultJSONResponse
+else:
+    DefaultJSONResponse = JSONResponse
+
+
+def model_response(model: BaseModel, status_code: int = 200) -> Response:
+    """
+    Serializes a response model straight to JSON bytes with pydantic-core. FastAPI's default path
+    converts the model to plain Python objects (jsonable_encoder) and encodes those again.
+    """
+    return Response(model.model_dump_json(), status_code=status_code, media_type="application/json")
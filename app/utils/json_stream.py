@@ -0,0 +1,74 @@
+import json
+from typing import List
+
+
+class ArrayElementStreamParser:
+    """
+    Incremental scanner for a streamed JSON document.
+    Yields each object inside the top-level array '<key>' as soon as its closing brace arrives,
+    without waiting for the rest of the document. Text is scanned exactly once across feeds.
+    """
+
+    def __init__(self, key: str):
+        self.key = key
+        self.text = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = -1
+        self._last_string = None  # Last complete string seen directly inside the top-level object
+        self._current_key = None
+        self._array_depth = None  # Depth inside the target array (None while outside of it)
+        self._element_start = -1
+
+    def feed(self, chunk: str) -> List[dict]:
+        """Appends a chunk and returns the array elements completed by it."""
+        self.text += chunk
+        completed = []
+        text = self.text
+
+        for pos in range(self._pos, len(text)):
+            ch = text[pos]
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        try:
+                            self._last_string = json.loads(text[self._string_start:pos + 1])
+                        except ValueError:
+                            self._last_string = None
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                self._string_start = pos
+            elif ch == ":" and self._depth == 1:
+                self._current_key = self._last_string
+            elif ch == "," and self._depth == 1:
+                self._current_key = None
+            elif ch in "{[":
+                if ch == "[" and self._depth == 1 and self._current_key == self.key:
+                    self._array_depth = self._depth + 1
+                elif ch == "{" and self._array_depth is not None and self._depth == self._array_depth:
+                    self._element_start = pos
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._array_depth is not None:
+                    if ch == "}" and self._depth == self._array_depth and self._element_start >= 0:
+                        try:
+                            completed.append(json.loads(text[self._element_start:pos + 1]))
+                        except ValueError:
+                            pass
+                        self._element_start = -1
+                    elif ch == "]" and self._depth == self._array_depth - 1:
+                        self._array_depth = None
+
+        self._pos = len(text)
+        return completed
@@ -0,0 +1,57 @@
+import threading
+from typing import Any, Callable, Dict, Hashable
+
+
+class _Call:
+    """Holds the shared outcome of one in-flight call."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls with the same key into a single execution.
+    The first caller (the 'leader') runs the function; every caller that arrives
+    while it is still running waits and receives the same result (or exception).
+    Nothing is cached after the call finishes.
+    """
+
+    def __init__(self, name: str = "singleflight"):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+                if call.waiters:
+                    print(f"🔗 [{self.name}] Shared result of {key!r} with {call.waiters} waiter(s)")
+            call.done.set()
+
+        return call.result
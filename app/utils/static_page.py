@@ -0,0 +1,75 @@
+import hashlib
+import os
+import threading
+import time
+from pathlib import Path
+
+from starlette.responses import Response
+
+from app.utils.compression import brotli, compress, negotiate_encoding
+
+# --- CONFIGURATION ---
+STAT_INTERVAL_SEC = 1.0  # The file is stat()ed at most this often to notice edits
+GZIP_STATIC_LEVEL = 9  # Precompressed once per file version, so the highest levels are affordable
+BROTLI_STATIC_QUALITY = 11
+CACHE_CONTROL = "no-cache"  # Browsers may cache but must revalidate (cheap 304 thanks to the ETag)
+
+
+class StaticPage:
+    """
+    A small static file served from memory. The file is read and precompressed (gzip, plus br when
+    the brotli package is installed) once per version; a changed mtime/size reloads it. Responses
+    carry a strong ETag per encoding and If-None-Match is answered with 304.
+    """
+
+    def __init__(self, path: Path, media_type: str = "text/html; charset=utf-8"):
+        self.path = path
+        self.media_type = media_type
+        self._lock = threading.Lock()
+        self._signature: tuple | None = None  # (mtime_ns, size) of the loaded version
+        self._variants: dict[str, bytes] = {}  # encoding ('identity', 'gzip', 'br') -> body
+        self._etag = ""
+        self._checked_at = 0.0
+
+    def _load(self):
+        # Caller must hold the lock. Raises FileNotFoundError if the file is missing.
+        stat = os.stat(self.path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if signature == self._signature:
+            return
+        body = self.path.read_bytes()
+        variants = {"identity": body, "gzip": compress(body, "gzip", GZIP_STATIC_LEVEL)}
+        if brotli is not None:
+            variants["br"] = compress(body, "br", BROTLI_STATIC_QUALITY)
+        self._variants = variants
+        self._etag = hashlib.sha1(body).hexdigest()[:16]
+        self._signature = signature
+        print(f"📄 Loaded {self.path.name}: " + ", ".join(f"{k} {len(v)} B" for k, v in variants.items()))
+
+    def _current(self) -> tuple[dict[str, bytes], str]:
+        now = time.monotonic()
+        with self._lock:
+            if self._signature is None or now - self._checked_at >= STAT_INTERVAL_SEC:
+                self._checked_at = now
+                try:
+                    self._load()
+                except FileNotFoundError:
+                    self._signature = None
+                    raise
+            return self._variants, self._etag
+
+    def response(self, accept_encoding: str = "", if_none_match: str | None = None) -> Response:
+        """Builds the response for one request. Raises FileNotFoundError if the file does not exist."""
+        variants, etag = self._current()
+        encoding = negotiate_encoding(accept_encoding, tuple(k for k in ("br", "gzip") if k in variants))
+        encoding = encoding or "identity"
+        tag = f'"{etag}"' if encoding == "identity" else f'"{etag}-{encoding}"'
+        headers = {"ETag": tag, "Cache-Control": CACHE_CONTROL, "Vary": "Accept-Encoding"}
+
+        if if_none_match and (if_none_match.strip() == "*" or tag in [t.strip().removeprefix("W/")
+                                                                       for t in if_none_match.split(",")]):
+            return Response(status_code=304, headers=headers)
+
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return Response(variants[encoding], media_type=self.media_type, headers=headers)
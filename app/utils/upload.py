@@ -0,0 +1,155 @@
+from fastapi import HTTPException, UploadFile
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.formparsers import MultiPartParser
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# --- CONFIGURATION ---
+SNIFF_BYTES = 16  # Enough for every magic number below
+READ_CHUNK_BYTES = 256 * 1024  # Chunk size when the upload size is not known in advance
+UPLOAD_OVERHEAD_BYTES = 64 * 1024  # Multipart overhead allowed on top of the file itself
+
+
+# --- FORMAT SNIFFING ---
+def sniff_upload_format(header: bytes, content_type: str | None = None) -> str | None:
+    """
+    Identifies an upload from its first bytes: 'image' (JPEG/PNG/WebP/BMP/TIFF), 'gif' or 'video'
+    (MP4/MOV, WebM/MKV, AVI). Returns None for anything else.
+    """
+    header = bytes(header[:SNIFF_BYTES])
+    if header[:3] == b"\xff\xd8\xff" or header[:8] == b"\x89PNG\r\n\x1a\n":
+        return "image"
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return "image"
+    if header[:2] == b"BM" or header[:4] in (b"II*\x00", b"MM\x00*"):
+        return "image"
+    if header[:6] in (b"GIF87a", b"GIF89a"):
+        return "gif"
+    if header[4:8] == b"ftyp" or header[:4] == b"\x1a\x45\xdf\xa3":
+        return "video"
+    if header[:4] == b"RIFF" and header[8:12] == b"AVI ":
+        return "video"
+    if content_type and content_type.startswith("video/") and len(header) >= SNIFF_BYTES:
+        # Containers without a fixed magic number (e.g. MPEG-TS) are left to the video decoder
+        return "video"
+    return None
+
+
+# --- BOUNDED INGESTION ---
+async def _readinto(file: UploadFile, view: memoryview) -> int:
+    # Starlette keeps file parts up to spool_max_size in memory; those are read directly,
+    # larger (or unknown-size) ones may be on disk and are read in the thread pool
+    if file.size is not None and file.size <= MultiPartParser.spool_max_size:
+        return file.file.readinto(view)
+    return await run_in_threadpool(file.file.readinto, view)
+
+
+async def read_upload_bounded(file: UploadFile, max_bytes: int) -> tuple[memoryview, str]:
+    """
+    Reads an upload into a single buffer without intermediate copies and returns
+    (memoryview over the bytes, sniffed format).
+    Rejects oversized uploads (413) before/while reading and non-media uploads (415) after the first bytes.
+    """
+    if file.size is not None and file.size > max_bytes:
+        raise HTTPException(status_code=413, detail=f"Upload exceeds the {max_bytes // (1024 * 1024)} MB limit.")
+
+    await file.seek(0)
+    header = await file.read(SNIFF_BYTES)
+    kind = sniff_upload_format(header, file.content_type)
+    if kind is None:
+        raise HTTPException(status_code=415, detail="Unsupported file type. Send a JPEG/PNG/WebP image, a GIF or a short video.")
+
+    if file.size is not None:
+        # Size known up front: one allocation, filled in place
+        buf = bytearray(file.size)
+        view = memoryview(buf)
+        view[:len(header)] = header
+        filled = len(header)
+        while filled < file.size:
+            n = await _readinto(file, view[filled:])
+            if not n:
+                break
+            filled += n
+        return view[:filled], kind
+
+    # Size unknown: grow the buffer chunk by chunk, enforcing the limit as we go
+    buf = bytearray(header)
+    chunk = bytearray(READ_CHUNK_BYTES)
+    chunk_view = memoryview(chunk)
+    while True:
+        n = await _readinto(file, chunk_view)
+        if not n:
+            break
+        if len(buf) + n > max_bytes:
+            raise HTTPException(status_code=413, detail=f"Upload exceeds the {max_bytes // (1024 * 1024)} MB limit.")
+        buf += chunk_view[:n]
+    return memoryview(buf), kind
+
+
+# --- REQUEST BODY LIMIT (ASGI) ---
+class _BodyTooLarge(Exception):
+    pass
+
+
+async def _send_413(send: Send):
+    body = b'{"detail":"Upload too large."}'
+    await send({
+        "type": "http.response.start",
+        "status": 413,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class UploadLimitMiddleware:
+    """
+    Caps POST bodies at max_bytes before Starlette parses and spools them.
+    A larger Content-Length is rejected without reading the body; bodies without one
+    (chunked transfer encoding) are counted as they are received and cut off at the limit.
+    """
+
+    def __init__(self, app: ASGIApp, max_bytes: int):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["method"] != "POST":
+            await self.app(scope, receive, send)
+            return
+
+        content_length = Headers(scope=scope).get("content-length")
+        if content_length and content_length.isdigit() and int(content_length) > self.max_bytes:
+            await _send_413(send)
+            return
+
+        received = 0
+        exceeded = False
+        response_started = False
+
+        async def limited_receive() -> Message:
+            nonlocal received, exceeded
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    exceeded = True
+                    raise _BodyTooLarge()
+            return message
+
+        async def guarded_send(message: Message):
+            nonlocal response_started
+            if exceeded:
+                # Whatever the app makes of the aborted body (usually a 400), the client gets a 413
+                if message["type"] == "http.response.start" and not response_started:
+                    response_started = True
+                    await _send_413(send)
+                return
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except _BodyTooLarge:
+            if not response_started:
+                await _send_413(send)
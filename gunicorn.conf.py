@@ -0,0 +1,65 @@
+"""
+Multi-worker launch with copy-on-write model sharing:
+
+    gunicorn main:app -c gunicorn.conf.py
+
+The master imports the app (preload_app) and loads the fork-safe model weights once before forking
+(HSEmotion, plus the OpenCV nets of the slim profile), so the workers share those pages copy-on-write.
+The full profile's DeepFace/TensorFlow models are loaded per worker: TensorFlow is not fork-safe.
+Use VISION_PROFILE=slim to share all vision weights.
+Each worker gets an equal share of the cores (CPU_CORES), applies its thread budget in the
+app's lifespan hook (app/core/config.py: apply_thread_budget) and warms up its inference runtimes.
+"""
+import gc
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "uvicorn.workers.UvicornWorker"
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+
+# Import main:app in the master before forking (model weights are loaded in when_ready below)
+preload_app = True
+
+# Defaults read by Settings must be set before app.core.config is first imported (settings is built then).
+# Each worker's thread budget is computed from its share of the cores
+os.environ.setdefault("CPU_CORES", str(max(1, (os.cpu_count() or 1) // workers)))
+# Weights are loaded in the master and warmed up per worker by the hooks below, not by the app's lifespan
+os.environ.setdefault("WARM_UP_ON_STARTUP", "0")
+# Every worker runs a cache warmer for its own metadata cache; they share the provider rate limit
+os.environ.setdefault("CACHE_WARMER_PROCESSES", str(workers))
+
+from app.core.config import thread_budget  # noqa: E402  (must follow the defaults above)
+
+# Keep the master single-threaded while it loads weights: thread pools (OpenMP, TF) created
+# before fork() are not inherited by the children and can deadlock them. This has to happen here,
+# at config load, before preload_app imports the application.
+# TensorFlow's pool sizes cannot be changed after start-up, so the budget below is also per worker.
+_budget = thread_budget()
+os.environ.setdefault("OMP_NUM_THREADS", "1")
+os.environ.setdefault("TF_NUM_INTRAOP_THREADS", str(_budget["tf_intra"]))
+os.environ.setdefault("TF_NUM_INTEROP_THREADS", str(_budget["tf_inter"]))
+
+
+def when_ready(server):
+    from app.core.models import preload_model_weights
+
+    preload_model_weights(before_fork=True)
+    # Move everything allocated so far out of the GC's generations: collections in the workers
+    # then never touch (and copy) these objects' pages
+    gc.collect()
+    gc.freeze()
+    server.log.info("Models preloaded in master (pid %s); forking %s workers", os.getpid(), workers)
+
+
+def post_worker_init(worker):
+    from app.core.config import apply_thread_budget
+    from app.core.models import warm_up_inference
+    from app.services import face_backend
+
+    # Runs before the app's lifespan hook; the budget has to be in place before the warm-up inference
+    apply_thread_budget()
+    if not face_backend.preload_is_fork_safe():
+        face_backend.preload()  # TensorFlow models: loaded after fork, in the worker
+    warm_up_inference()
+    worker.log.info("Worker %s warmed up", os.getpid())
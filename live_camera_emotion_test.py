@@ -1,13 +1,16 @@
 import cv2
 import numpy as np
+import queue
 import threading
+import time
 from deepface import DeepFace
 from typing import Dict, Tuple, Optional
-from app.core.models import (THRESHOLDS, EMOTION_CLASSES, emotion_recognizer)
+from app.core.models import (THRESHOLDS, EMOTION_CLASSES, get_emotion_recognizer)
 
 # --- 1. CONFIGURATION & CONSTANTS (Only specific to the live demo) ---
 CAMERA_ID = 1  # Default camera index (Try 0 if 1 fails)
 SCALE_FACTOR = 0.5  # Resize frame for faster processing
+REDETECT_INTERVAL = 15  # Run the (expensive) face detector every N analysed frames; track in between
 
 # Drawing Colors (BGR format for OpenCV, used in the live test script)
 COLORS: Dict[str, Tuple[int, int, int]] = {
@@ -24,8 +27,9 @@ current_data: Dict = {
     "scores": {}
 }
 face_coords: Optional[Tuple[int, int, int, int]] = None
-is_analyzing: bool = False
+analysis_fps: float = 0.0
 lock = threading.Lock()  # Lock for thread-safe state update
+frame_slot: "queue.Queue[np.ndarray]" = queue.Queue(maxsize=1)  # Single slot: only the latest frame waits
 
 
 # --- 3. EMOTION ALGORITHM (Core VibeLens Logic - Copied for standalone execution) ---
@@ -96,74 +100,139 @@ def calculate_custom_emotion(scores_array: np.ndarray) -> Tuple[str, Dict[str, f
     return best_emotion, final_scores
 
 
-# --- 4. ANALYSIS THREAD FUNCTION ---
-def run_analysis(frame: np.ndarray):
+# --- 4. FACE DETECTION + TRACKING ---
+def create_tracker():
+    """Creates the lightest available OpenCV tracker (KCF from contrib, MIL as a fallback)."""
+    for factory in ("TrackerKCF_create", "legacy.TrackerKCF_create", "TrackerMIL_create"):
+        owner = cv2
+        for part in factory.split(".")[:-1]:
+            owner = getattr(owner, part, None)
+        create = getattr(owner, factory.split(".")[-1], None) if owner is not None else None
+        if create is not None:
+            return create()
+    raise RuntimeError("No OpenCV tracker available (install opencv-contrib-python)")
+
+
+class FaceTracker:
     """
-    Executed in a separate thread to analyze the image frame.
-    Updates the global state (current_data, face_coords) using the imported model.
+    Detect-then-track: runs DeepFace detection every REDETECT_INTERVAL frames (or when tracking is lost)
+    and follows the face box with a cheap OpenCV tracker on the frames in between.
+    Works on the downscaled frame; boxes are returned in downscaled coordinates.
     """
-    global current_data, face_coords, is_analyzing
-
-    if emotion_recognizer is None:
-        is_analyzing = False
-        return
 
-    try:
-        small_frame = cv2.resize(frame, (0, 0), fx=SCALE_FACTOR, fy=SCALE_FACTOR)
+    def __init__(self, redetect_interval: int = REDETECT_INTERVAL):
+        self.redetect_interval = redetect_interval
+        self.tracker = None
+        self.frames_since_detect = 0
 
+    def _detect(self, small_frame: np.ndarray) -> Optional[Tuple[int, int, int, int]]:
         face_objs = DeepFace.extract_faces(
             img_path=small_frame,
             detector_backend='opencv',
             enforce_detection=False,
-            align=True
+            align=False
         )
+        # With enforce_detection=False a miss comes back as the whole frame with zero confidence
+        if not face_objs or face_objs[0].get('confidence', 0) <= 0:
+            return None
+        area = face_objs[0]['facial_area']
+        return area['x'], area['y'], area['w'], area['h']
+
+    def update(self, small_frame: np.ndarray) -> Optional[Tuple[int, int, int, int]]:
+        if self.tracker is not None and self.frames_since_detect < self.redetect_interval:
+            ok, box = self.tracker.update(small_frame)
+            if ok:
+                self.frames_since_detect += 1
+                return tuple(int(v) for v in box)
+            # Tracking lost: fall through to a fresh detection
+
+        box = self._detect(small_frame)
+        self.frames_since_detect = 0
+        if box is None:
+            self.tracker = None
+            return None
+
+        self.tracker = create_tracker()
+        self.tracker.init(small_frame, box)
+        return box
+
+
+# --- 5. ANALYSIS WORKER ---
+def submit_frame(frame: np.ndarray):
+    """Puts a frame into the single slot, replacing a frame the worker has not picked up yet."""
+    try:
+        frame_slot.get_nowait()
+    except queue.Empty:
+        pass
+    try:
+        frame_slot.put_nowait(frame)
+    except queue.Full:
+        pass
 
-        if not face_objs:
-            with lock:
-                face_coords = None
-            return
-
-        face_data = face_objs[0]
-
-        # Rescale coordinates back to original frame size
-        area = face_data['facial_area']
-        new_coords = (
-            int(area['x'] / SCALE_FACTOR),
-            int(area['y'] / SCALE_FACTOR),
-            int(area['w'] / SCALE_FACTOR),
-            int(area['h'] / SCALE_FACTOR)
-        )
-
-        # Prepare face image for HSEmotion
-        face_img = face_data['face']
-        face_img_uint8 = (face_img * 255).astype(np.uint8)
-        face_img_rgb = cv2.cvtColor(face_img_uint8, cv2.COLOR_BGR2RGB)
-
-        # Emotion prediction (Uses imported object)
-        _, scores = emotion_recognizer.predict_emotions(face_img_rgb, logits=False)
 
-        # Apply VibeLens custom logic
-        dom, adjusted_scores = calculate_custom_emotion(scores)
+def analysis_worker():
+    """
+    Persistent worker thread: takes the latest frame from the slot, tracks/detects the face
+    and runs HSEmotion on the tracked crop. Updates the global state (current_data, face_coords).
+    """
+    global current_data, face_coords, analysis_fps
 
-        raw_score_dict_full = {EMOTION_CLASSES[i]: scores[i] for i in range(len(scores))}
-        sec = get_secondary_emotion(raw_score_dict_full, dom)
+    tracker = FaceTracker()
+    last_done = time.perf_counter()
 
-        # Update global state safely
-        with lock:
-            current_data = {
-                "dominant": dom,
-                "secondary": sec,
-                "scores": adjusted_scores
-            }
-            face_coords = new_coords
+    while True:
+        frame = frame_slot.get()
+        try:
+            small_frame = cv2.resize(frame, (0, 0), fx=SCALE_FACTOR, fy=SCALE_FACTOR)
+            box = tracker.update(small_frame)
+
+            if box is None:
+                with lock:
+                    face_coords = None
+                continue
+
+            # Rescale coordinates back to original frame size
+            x, y, w, h = box
+            new_coords = (
+                int(x / SCALE_FACTOR),
+                int(y / SCALE_FACTOR),
+                int(w / SCALE_FACTOR),
+                int(h / SCALE_FACTOR)
+            )
+
+            # Prepare the tracked face crop for HSEmotion
+            fx, fy, fw, fh = new_coords
+            face_img = frame[max(fy, 0):fy + fh, max(fx, 0):fx + fw]
+            if face_img.size == 0:
+                continue
+            face_img_rgb = cv2.cvtColor(cv2.resize(face_img, (224, 224)), cv2.COLOR_BGR2RGB)
+
+            # Emotion prediction (Uses imported object)
+            _, scores = get_emotion_recognizer().predict_emotions(face_img_rgb, logits=False)
+
+            # Apply VibeLens custom logic
+            dom, adjusted_scores = calculate_custom_emotion(scores)
+
+            raw_score_dict_full = {EMOTION_CLASSES[i]: scores[i] for i in range(len(scores))}
+            sec = get_secondary_emotion(raw_score_dict_full, dom)
+
+            # Update global state safely
+            now = time.perf_counter()
+            with lock:
+                current_data = {
+                    "dominant": dom,
+                    "secondary": sec,
+                    "scores": adjusted_scores
+                }
+                face_coords = new_coords
+                analysis_fps = 0.9 * analysis_fps + 0.1 * (1.0 / max(now - last_done, 1e-6))
+            last_done = now
 
-    except Exception:
-        pass
-    finally:
-        is_analyzing = False
+        except Exception:
+            pass
 
 
-# --- 5. UI DRAWING FUNCTION ---
+# --- 6. UI DRAWING FUNCTION ---
 def draw_ui(frame: np.ndarray):
     """Draws the face bounding box, emotion label, and score panel on the frame."""
 
@@ -173,6 +242,7 @@ def draw_ui(frame: np.ndarray):
         sec = current_data["secondary"]
         scores = current_data["scores"]
         coords = face_coords
+        fps = analysis_fps
 
     # 1. FACE BOX AND LABEL
     if coords:
@@ -219,29 +289,37 @@ def draw_ui(frame: np.ndarray):
             cv2.rectangle(frame, (155, y_offset - 10), (155 + bar_len, y_offset), color, -1)
             y_offset += 30
 
+    # 3. ANALYSIS FPS
+    cv2.putText(frame, f"Analysis FPS: {fps:.1f}", (10, frame.shape[0] - 15),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+
 
-# --- 6. MAIN CAMERA LOOP ---
+# --- 7. MAIN CAMERA LOOP ---
 def start_camera():
     """Initializes the camera and runs the main video processing loop."""
-    global is_analyzing
     print(f" Starting camera capture (ID: {CAMERA_ID})...")
 
+    if get_emotion_recognizer() is None:
+        print(" HSEmotion model is not available.")
+        return
+
     cap = cv2.VideoCapture(CAMERA_ID)
     if not cap.isOpened():
         print(" Could not open camera.")
         return
 
+    # One persistent analysis thread for the whole session
+    worker = threading.Thread(target=analysis_worker, daemon=True)
+    worker.start()
+
     while True:
         ret, frame = cap.read()
         if not ret: break
 
         frame = cv2.flip(frame, 1)
 
-        if not is_analyzing:
-            is_analyzing = True
-            t = threading.Thread(target=run_analysis, args=(frame.copy(),))
-            t.daemon = True
-            t.start()
+        # Hand the newest frame to the worker; a frame it has not picked up yet is replaced
+        submit_frame(frame.copy())
 
         draw_ui(frame)
 
@@ -1,7 +1,55 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from starlette.concurrency import run_in_threadpool
 from app.api.router import router
+from app.core.config import settings, apply_thread_budget
+from app.services.job_queue import job_workers
+from app.services.cache_warmer import cache_warmer
+from app.services.request_log import request_log_writer
+from app.utils.compression import CompressionMiddleware
+from app.utils.upload import UploadLimitMiddleware, UPLOAD_OVERHEAD_BYTES
+from app.utils.json_response import DefaultJSONResponse
+
+
+def _warm_up_models():
+    # Heavy dependencies (torch, DeepFace/TensorFlow) are only imported here, not by 'import main'
+    from app.core.models import preload_model_weights, warm_up_inference
+
+    try:
+        preload_model_weights()
+        warm_up_inference()
+    except Exception as e:
+        print(f" Model warm-up failed (models will load on first request): {e}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Before any model loads, so torch/TensorFlow pick up the budget when they are imported
+    apply_thread_budget()
+    if settings.WARM_UP_ON_STARTUP:
+        await run_in_threadpool(_warm_up_models)
+    job_workers.start()
+    cache_warmer.start()
+    yield
+    cache_warmer.stop()
+    job_workers.stop()
+    request_log_writer.stop()  # Flush queued request events
+
+
+# orjson (when installed) for every JSON response; /analyze serializes its model directly
+app = FastAPI(title="VibeLens API", lifespan=lifespan, default_response_class=DefaultJSONResponse)
+
+# Body limit at the ASGI level: covers chunked uploads without a Content-Length as well
+app.add_middleware(UploadLimitMiddleware, max_bytes=settings.MAX_UPLOAD_BYTES + UPLOAD_OVERHEAD_BYTES)
 
-app = FastAPI(title="VibeLens API")
+# Negotiated br/gzip for JSON and text responses (outermost, so it also covers the 413 above)
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MIN_BYTES,
+    gzip_level=settings.GZIP_LEVEL,
+    brotli_quality=settings.BROTLI_QUALITY,
+)
 
 # Router'ı dahil et
 app.include_router(router)
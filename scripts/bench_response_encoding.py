@@ -0,0 +1,130 @@
+"""
+Bytes on the wire and CPU per response for the fast response path.
+
+  * Serialization of a typical /analyze answer: FastAPI's default path (jsonable_encoder + json.dumps),
+    jsonable_encoder + orjson (the app's default response class) and pydantic's model_dump_json
+    (what /analyze now returns through model_response).
+  * Compression of that body: identity, gzip and brotli (if installed) at several levels.
+  * The status page: reading static/index.html per hit versus the in-memory StaticPage.
+
+CPU is process time per operation, averaged over --iterations runs.
+
+Usage:
+    python scripts/bench_response_encoding.py [--iterations 2000 --recommendations 5]
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+
+from app.schemas.analysis import VibeResponse  # noqa: E402
+from app.utils.compression import brotli, compress  # noqa: E402
+from app.utils.json_response import orjson  # noqa: E402
+from app.utils.static_page import StaticPage  # noqa: E402
+
+STATUS_PAGE = Path(__file__).resolve().parent.parent / "static/index.html"
+
+
+def sample_response(n_recommendations: int) -> VibeResponse:
+    return VibeResponse(
+        mood_title="Sessiz Bir Hüzün",
+        mood_description="Bugün biraz içe dönük ve düşünceli görünüyorsun; sakin, duygusal hikâyeler iyi gelebilir.",
+        dominant_emotion="Sadness",
+        secondary_emotion="Neutral",
+        detected_age=29,
+        detected_gender="Woman",
+        emotion_scores={
+            "Sadness": 0.58, "Neutral": 0.17, "Fear": 0.08, "Surprise": 0.06,
+            "Anger": 0.05, "Happiness": 0.03, "Disgust": 0.02, "Contempt": 0.01,
+        },
+        recommendations=[
+            {
+                "title": f"Recommended Title {i}",
+                "creator": "Some Director",
+                "rating": "7.8",
+                "poster_url": f"/posters/{i:032x}",
+                "overview": "A quiet, character-driven drama about loss, memory and finding a way back to the "
+                            "people who matter, told over one long winter in a small coastal town. " * 2,
+                "year": "2019",
+                "reason": "Hüzünlü ruh haline eşlik eden, yavaş ama umut veren bir hikâye.",
+                "external_links": {"imdb": f"https://www.imdb.com/find?q=Recommended+Title+{i}"},
+            }
+            for i in range(n_recommendations)
+        ],
+    )
+
+
+def cpu_per_call(fn, iterations: int) -> float:
+    """Average process time per call in microseconds."""
+    fn()  # Warm-up
+    start = time.process_time()
+    for _ in range(iterations):
+        fn()
+    return (time.process_time() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--recommendations", type=int, default=5)
+    args = parser.parse_args()
+
+    model = sample_response(args.recommendations)
+
+    # --- Serialization ---
+    serializers = {
+        "jsonable_encoder + json.dumps": lambda: json.dumps(
+            jsonable_encoder(model), ensure_ascii=False, separators=(",", ":")).encode("utf-8"),
+    }
+    if orjson is not None:
+        serializers["jsonable_encoder + orjson"] = lambda: orjson.dumps(jsonable_encoder(model))
+    serializers["model_dump_json (pydantic-core)"] = lambda: model.model_dump_json().encode("utf-8")
+
+    print(f"Serialization ({args.recommendations} recommendations, {args.iterations} iterations)")
+    print(f"  {'method':<34} {'bytes':>7} {'µs/resp':>9}")
+    for name, fn in serializers.items():
+        print(f"  {name:<34} {len(fn()):>7} {cpu_per_call(fn, args.iterations):>9.1f}")
+    if orjson is None:
+        print("  (orjson not installed: the default response class falls back to JSONResponse)")
+
+    # --- Compression ---
+    body = model.model_dump_json().encode("utf-8")
+    variants = [("identity", None), ("gzip", 1), ("gzip", 6), ("gzip", 9)]
+    if brotli is not None:
+        variants += [("br", 1), ("br", 5), ("br", 11)]
+    print(f"\nCompression of the {len(body)} B /analyze body")
+    print(f"  {'coding':<12} {'bytes':>7} {'ratio':>7} {'µs/resp':>9}")
+    for coding, level in variants:
+        if level is None:
+            print(f"  {coding:<12} {len(body):>7} {1.0:>7.2f} {0.0:>9.1f}")
+            continue
+        fn = lambda: compress(body, coding, level)  # noqa: E731
+        iterations = args.iterations if level < 11 else max(1, args.iterations // 20)
+        size = len(fn())
+        print(f"  {coding + ' ' + str(level):<12} {size:>7} {size / len(body):>7.2f} {cpu_per_call(fn, iterations):>9.1f}")
+    if brotli is None:
+        print("  (brotli not installed: only gzip is negotiated)")
+
+    # --- Status page ---
+    if STATUS_PAGE.exists():
+        page = StaticPage(STATUS_PAGE)
+        page.response()  # Loads and precompresses once
+        encoding = "br" if brotli is not None else "gzip"
+        per_hit_read = cpu_per_call(lambda: STATUS_PAGE.read_text(encoding="utf-8"), args.iterations)
+        cached = cpu_per_call(lambda: page.response(encoding), args.iterations)
+        etag = page.response(encoding).headers["etag"]
+        revalidated = cpu_per_call(lambda: page.response(encoding, etag), args.iterations)
+        sizes = {k: len(v) for k, v in page._variants.items()}
+        print(f"\nStatus page ({STATUS_PAGE.name}): " + ", ".join(f"{k} {v} B" for k, v in sizes.items()))
+        print(f"  read from disk per hit       {per_hit_read:>9.1f} µs")
+        print(f"  StaticPage ({encoding:<4})            {cached:>9.1f} µs")
+        print(f"  StaticPage 304 revalidation  {revalidated:>9.1f} µs")
+
+
+if __name__ == "__main__":
+    main()
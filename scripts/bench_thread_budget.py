@@ -0,0 +1,150 @@
+"""
+Throughput under concurrency for different CPU thread budgets.
+
+Each budget runs in a fresh interpreter (torch interop and TensorFlow pool sizes cannot be changed
+once set): apply_thread_budget() is called, then --concurrency threads run the workload back to back
+for --duration seconds. Prints requests/s and latency percentiles per budget.
+
+Budgets: an integer N gives every runtime (torch, TensorFlow, OpenCV) N threads; 'auto' uses the
+split derived from --cores; 'all' gives every runtime all cores (the unmanaged default).
+
+Usage:
+    python scripts/bench_thread_budget.py --budgets all auto 1 2 4 --concurrency 4
+    python scripts/bench_thread_budget.py --workload pipeline --image face.jpg --budgets auto 2
+    python scripts/bench_thread_budget.py --workload opencv --cores 8   # No model weights needed
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+WORKLOADS = ["emotion", "opencv", "pipeline"]
+
+
+# --- WORKLOADS (run inside the child process) ---
+def build_workload(name: str, image_path: str | None):
+    import cv2
+    import numpy as np
+
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, 255, (1080, 1920, 3), dtype=np.uint8)
+
+    if name == "opencv":
+        def run():
+            small = cv2.resize(frame, (640, 360), interpolation=cv2.INTER_AREA)
+            gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+            cv2.GaussianBlur(gray, (15, 15), 0)
+        return run
+
+    if name == "emotion":
+        from app.core.models import get_emotion_recognizer
+
+        recognizer = get_emotion_recognizer()
+        if recognizer is None:
+            raise SystemExit("HSEmotion could not be loaded (is torch installed?)")
+
+        def run():
+            face = cv2.resize(frame[200:800, 600:1200], (224, 224))
+            recognizer.predict_emotions(cv2.cvtColor(face, cv2.COLOR_BGR2RGB), logits=False)
+        return run
+
+    # Full /analyze pipeline: detection, HSEmotion and demography on a real photo
+    from app.services.vision_service import analyze_image_with_smart_ai
+
+    if not image_path:
+        raise SystemExit("--workload pipeline needs --image")
+    data = Path(image_path).read_bytes()
+    return lambda: analyze_image_with_smart_ai(data)
+
+
+def run_child(args):
+    from app.core.config import apply_thread_budget
+
+    budget = apply_thread_budget(args.cores)
+    work = build_workload(args.workload, args.image)
+    work()  # Warm-up outside the measured window
+
+    latencies = []
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + args.duration
+
+    def loop():
+        while time.perf_counter() < stop_at:
+            started = time.perf_counter()
+            work()
+            with lock:
+                latencies.append(time.perf_counter() - started)
+
+    threads = [threading.Thread(target=loop) for _ in range(args.concurrency)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    pct = lambda p: latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000 if latencies else 0.0
+    print(json.dumps({
+        "budget": budget,
+        "requests": len(latencies),
+        "rps": len(latencies) / elapsed,
+        "p50_ms": pct(0.50),
+        "p95_ms": pct(0.95),
+        "p99_ms": pct(0.99),
+    }))
+
+
+# --- DRIVER ---
+def budget_env(spec: str, cores: int) -> dict:
+    env = dict(os.environ, CPU_CORES=str(cores), WARM_UP_ON_STARTUP="0")
+    for key in ("TORCH_THREADS", "TF_INTRA_THREADS", "OPENCV_THREADS"):
+        env.pop(key, None)
+        if spec == "all":
+            env[key] = str(cores)
+        elif spec != "auto":
+            env[key] = str(int(spec))
+    return env
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workload", choices=WORKLOADS, default="emotion")
+    parser.add_argument("--image", help="Photo for --workload pipeline")
+    parser.add_argument("--budgets", nargs="+", default=["all", "auto", "1", "2"])
+    parser.add_argument("--cores", type=int, default=os.cpu_count() or 1, help="Core count the budgets are computed for")
+    parser.add_argument("--concurrency", type=int, default=4, help="Simultaneous requests")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per budget")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args)
+        return
+
+    print(f"Workload '{args.workload}', {args.concurrency} concurrent, {args.cores} cores, {args.duration:.0f}s per budget\n")
+    print(f"{'Budget':<7} {'torch':>5} {'tf':>4} {'cv':>4} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for spec in args.budgets:
+        cmd = [sys.executable, __file__, "--child", "--workload", args.workload, "--cores", str(args.cores),
+               "--concurrency", str(args.concurrency), "--duration", str(args.duration)]
+        if args.image:
+            cmd += ["--image", args.image]
+        proc = subprocess.run(cmd, cwd=ROOT, env=budget_env(spec, args.cores), capture_output=True, text=True)
+        if proc.returncode != 0:
+            print(f"{spec:<7} failed: {(proc.stderr or proc.stdout).strip().splitlines()[-1]}")
+            continue
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+        b = result["budget"]
+        print(f"{spec:<7} {b['torch']:>5} {b['tf_intra']:>4} {b['opencv']:>4} {result['rps']:8.1f} "
+              f"{result['p50_ms']:8.1f} {result['p95_ms']:8.1f} {result['p99_ms']:8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Peak RSS of upload ingestion: the old path (await file.read() -> bytes -> np.frombuffer -> imdecode)
+versus read_upload_bounded (single preallocated buffer -> memoryview -> imdecode).
+Each mode runs in a fresh subprocess so peak RSS (ru_maxrss) is not polluted by the other.
+
+Usage:
+    python scripts/bench_upload_rss.py [--width 6000 --height 4000]
+"""
+import argparse
+import asyncio
+import resource
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import cv2
+import numpy as np
+from starlette.datastructures import Headers, UploadFile
+
+from app.utils.upload import read_upload_bounded
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux (bytes on macOS)
+    scale = 1 / (1024 * 1024) if sys.platform == "darwin" else 1 / 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+def make_upload(payload: bytes) -> UploadFile:
+    # Same spooling Starlette uses for multipart file parts (rolls to disk after 1 MB)
+    spool = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    spool.write(payload)
+    spool.seek(0)
+    return UploadFile(spool, size=len(payload), headers=Headers({"content-type": "image/jpeg"}))
+
+
+async def ingest(mode: str, upload: UploadFile):
+    if mode == "old":
+        data = await upload.read()
+        img = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+    else:
+        view, _ = await read_upload_bounded(upload, max_bytes=1 << 31)
+        img = cv2.imdecode(np.frombuffer(view, np.uint8), cv2.IMREAD_COLOR)
+    return img.shape
+
+
+def run_child(mode: str, payload_path: str):
+    payload = Path(payload_path).read_bytes()
+    upload = make_upload(payload)
+    del payload
+    baseline = peak_rss_mb()
+    shape = asyncio.run(ingest(mode, upload))
+    print(f"{mode},{peak_rss_mb() - baseline:.1f},{shape[1]}x{shape[0]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--width", type=int, default=6000)
+    parser.add_argument("--height", type=int, default=4000)
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--payload", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.payload)
+        return
+
+    rng = np.random.default_rng(0)
+    img = rng.integers(0, 255, (args.height, args.width, 3), dtype=np.uint8)
+    ok, encoded = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, 95])
+    with tempfile.NamedTemporaryFile(suffix=".jpg", delete=False) as f:
+        f.write(encoded.tobytes())
+        payload_path = f.name
+
+    decoded_mb = args.width * args.height * 3 / (1024 * 1024)
+    print(f"Upload: {len(encoded) / (1024 * 1024):.1f} MB JPEG, decoded frame {decoded_mb:.1f} MB\n")
+    print(f"{'Mode':<6} {'Peak RSS delta (MB)':>20}")
+    for mode in ("old", "new"):
+        out = subprocess.run(
+            [sys.executable, __file__, "--child", mode, "--payload", payload_path],
+            capture_output=True, text=True, check=True
+        ).stdout.strip().splitlines()[-1]
+        name, delta, _ = out.split(",")
+        print(f"{name:<6} {float(delta):>20.1f}")
+    Path(payload_path).unlink()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Startup-time and memory comparison of the vision profiles.
+For each profile, a fresh interpreter imports the vision pipeline, preloads the face models and
+analyses one image; the script reports the time of each step, peak RSS and whether TensorFlow
+was imported.
+
+Usage:
+    python scripts/compare_vision_profiles.py [--image path/to/face.jpg]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_IMAGE = ROOT / "assets" / "vibelens_live_analysis.jpeg"
+
+CHILD_CODE = r"""
+import json, resource, sys, time
+t0 = time.perf_counter()
+from app.services.vision_service import analyze_image_with_smart_ai
+from app.services import face_backend
+t1 = time.perf_counter()
+face_backend.preload()
+t2 = time.perf_counter()
+result = analyze_image_with_smart_ai(open(sys.argv[1], "rb").read())
+t3 = time.perf_counter()
+scale = 1 / (1024 * 1024) if sys.platform == "darwin" else 1 / 1024
+print(json.dumps({
+    "import_s": t1 - t0,
+    "preload_s": t2 - t1,
+    "first_analysis_s": t3 - t2,
+    "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale,
+    "tensorflow_imported": "tensorflow" in sys.modules,
+    "face_found": result is not None,
+}))
+"""
+
+
+def run_profile(profile: str, image: Path) -> dict:
+    env = dict(os.environ, VISION_PROFILE=profile)
+    proc = subprocess.run(
+        [sys.executable, "-c", CHILD_CODE, str(image)],
+        cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        return {"error": proc.stderr.strip().splitlines()[-1] if proc.stderr else "failed"}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--image", type=Path, default=DEFAULT_IMAGE)
+    args = parser.parse_args()
+
+    print(f"{'Profile':<8} {'Import s':>9} {'Preload s':>10} {'1st run s':>10} {'Peak RSS MB':>12} {'TF':>4}")
+    for profile in ("full", "slim"):
+        r = run_profile(profile, args.image)
+        if "error" in r:
+            print(f"{profile:<8} error: {r['error']}")
+            continue
+        print(f"{profile:<8} {r['import_s']:>9.2f} {r['preload_s']:>10.2f} {r['first_analysis_s']:>10.2f} "
+              f"{r['peak_rss_mb']:>12.0f} {'yes' if r['tensorflow_imported'] else 'no':>4}")
+
+
+if __name__ == "__main__":
+    main()
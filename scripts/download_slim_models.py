@@ -0,0 +1,45 @@
+"""
+Downloads the OpenCV DNN models used by the slim vision profile (VISION_PROFILE=slim)
+into SLIM_MODELS_DIR (default: models/slim).
+
+Usage:
+    python scripts/download_slim_models.py
+"""
+import sys
+from pathlib import Path
+
+import requests
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.core.config import settings
+from app.services.face_backend import SLIM_MODEL_FILES
+
+GENDER_AGE_REPO = "https://github.com/smahesh29/Gender-and-Age-Detection/raw/master"
+MODEL_URLS = {
+    "face": "https://github.com/opencv/opencv_zoo/raw/main/models/face_detection_yunet/face_detection_yunet_2023mar.onnx",
+    "age_proto": f"{GENDER_AGE_REPO}/age_deploy.prototxt",
+    "age_model": f"{GENDER_AGE_REPO}/age_net.caffemodel",
+    "gender_proto": f"{GENDER_AGE_REPO}/gender_deploy.prototxt",
+    "gender_model": f"{GENDER_AGE_REPO}/gender_net.caffemodel",
+}
+
+
+def main():
+    target_dir = Path(settings.SLIM_MODELS_DIR)
+    target_dir.mkdir(parents=True, exist_ok=True)
+
+    for key, filename in SLIM_MODEL_FILES.items():
+        path = target_dir / filename
+        if path.exists():
+            print(f"✓ {filename} already present")
+            continue
+        print(f"⬇️  {filename} ...")
+        response = requests.get(MODEL_URLS[key], timeout=60)
+        response.raise_for_status()
+        path.write_bytes(response.content)
+        print(f"✓ {filename} ({len(response.content) / (1024 * 1024):.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Import-time profile of the app package and start-up budget check.
+
+Runs `python -X importtime -c "import main"` in a fresh interpreter, prints the modules with the
+highest cumulative import cost and the wall time of the whole import. Exits non-zero when the
+wall time exceeds the budget, so it can gate CI or a pre-commit hook.
+
+Usage:
+    python scripts/profile_imports.py                  # top 25 modules, 2.0 s budget
+    python scripts/profile_imports.py --top 40 --budget 1.5
+    IMPORT_TIME_BUDGET=1.0 python scripts/profile_imports.py
+    python scripts/profile_imports.py --forbid torch tensorflow deepface google.generativeai
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Heavy dependencies that 'import main' must not pull in (they load in the lifespan hook or on first use)
+DEFAULT_FORBIDDEN = ["torch", "hsemotion", "tensorflow", "deepface", "google.generativeai", "duckduckgo_search", "PIL"]
+
+
+def run_importtime(module: str) -> tuple[float, str]:
+    """Imports the module in a fresh interpreter; returns (wall seconds, -X importtime report)."""
+    # Profile the import only; no model warm-up can run since the app is never started
+    env = dict(os.environ, WARM_UP_ON_STARTUP="0")
+    code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        sys.stderr.write(proc.stderr)
+        raise SystemExit(f"'import {module}' failed (exit {proc.returncode})")
+    lines = proc.stdout.strip().splitlines()
+    wall = float(lines[-1]) if lines else time.perf_counter() - started
+    return wall, proc.stderr
+
+
+def parse_importtime(report: str) -> list[tuple[str, int, int]]:
+    """Parses '-X importtime' lines into [(module, self us, cumulative us)]."""
+    rows = []
+    for line in report.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+            rows.append((name.strip(), int(self_us), int(cumulative_us)))
+        except ValueError:
+            continue
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="main", help="Module to import (default: main)")
+    parser.add_argument("--top", type=int, default=25, help="Number of modules to list")
+    parser.add_argument("--budget", type=float, default=float(os.getenv("IMPORT_TIME_BUDGET", "2.0")),
+                        help="Max wall time in seconds for the import (env: IMPORT_TIME_BUDGET)")
+    parser.add_argument("--forbid", nargs="*", default=DEFAULT_FORBIDDEN,
+                        help="Top-level packages the import must not load")
+    args = parser.parse_args()
+
+    wall, report = run_importtime(args.module)
+    rows = parse_importtime(report)
+
+    print(f"{'Cumulative ms':>13} {'Self ms':>9}  Module")
+    for name, self_us, cumulative_us in sorted(rows, key=lambda r: r[2], reverse=True)[:args.top]:
+        print(f"{cumulative_us / 1000:13.1f} {self_us / 1000:9.1f}  {name}")
+
+    failed = False
+    loaded = {name for name, _, _ in rows}
+    leaked = [pkg for pkg in args.forbid if pkg in loaded]
+    if leaked:
+        print(f"\n Heavy dependencies imported eagerly: {', '.join(leaked)}")
+        failed = True
+
+    print(f"\n'import {args.module}': {wall:.3f}s wall, {len(rows)} modules (budget {args.budget:.2f}s)")
+    if wall > args.budget:
+        print(" Import-time budget exceeded.")
+        failed = True
+    else:
+        print(" Within budget.")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
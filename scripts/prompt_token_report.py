@@ -0,0 +1,72 @@
+"""
+Prompt size report: compares what build_gemini_prompt sent per request before the system
+instruction split (persona + rules + template + user payload, all in one message) with what is
+billed now: the per-user payload plus the category's system instruction. The instruction is not
+context-cached (it is below Gemini's minimum cacheable size), so it counts towards every request;
+the saving comes from no longer duplicating the user line.
+
+Usage:
+    python scripts/prompt_token_report.py            # offline estimate (~4 chars per token)
+    python scripts/prompt_token_report.py --online   # exact counts via Gemini count_tokens
+"""
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.core.config import settings
+from app.core.prompts import SYSTEM_INSTRUCTIONS, build_gemini_prompt
+from app.schemas.analysis import Category
+
+SAMPLE_CONTEXT = {
+    "age": 27,
+    "gender": "Woman",
+    "emotion": "Sadness",
+    "secondary_emotion": "Fear",
+    "raw_scores": {
+        "Sadness": 0.61, "Fear": 0.12, "Neutral": 0.09, "Anger": 0.06,
+        "Surprise": 0.05, "Disgust": 0.03, "Contempt": 0.02, "Happiness": 0.02
+    },
+}
+
+
+def make_counter(online: bool):
+    if not online:
+        return lambda text: round(len(text) / 4), "estimated"
+
+    import google.generativeai as genai
+    genai.configure(api_key=settings.GEMINI_API_KEY)
+    model = genai.GenerativeModel(settings.GEMINI_MODEL)
+    return lambda text: model.count_tokens(text).total_tokens, "count_tokens"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--online", action="store_true", help="Use the Gemini count_tokens API (needs GEMINI_API_KEY)")
+    args = parser.parse_args()
+
+    count, method = make_counter(args.online)
+    print(f"Token counting method: {method}\n")
+    print(f"{'Category':<10} {'Before':>8} {'After':>8} {'Payload':>8} {'Static':>8} {'Saved':>7}")
+
+    for category in Category:
+        payload = build_gemini_prompt(category=category, **SAMPLE_CONTEXT)
+        # The old prompt carried the static block, the payload and a duplicated 'KULLANICI' line
+        duplicate_line = payload.splitlines()[0]
+        before = SYSTEM_INSTRUCTIONS[category] + "\n" + duplicate_line + "\n" + payload
+
+        before_tokens = count(before)
+        payload_tokens = count(payload)
+        static_tokens = count(SYSTEM_INSTRUCTIONS[category])
+        after_tokens = payload_tokens + static_tokens
+        saved = 100 * (1 - after_tokens / before_tokens) if before_tokens else 0.0
+        print(f"{category.value:<10} {before_tokens:>8} {after_tokens:>8} {payload_tokens:>8} "
+              f"{static_tokens:>8} {saved:>6.1f}%")
+
+    print("\n'After' is what each request is billed for: the user message ('Payload') plus the system")
+    print("instruction ('Static'), which is sent with every request (no context caching).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""
+Latency report over the structured request log (REQUEST_LOG_DIR, written by app/services/request_log.py).
+
+Streams the active requests-<pid>.jsonl files and the gzip-rotated archives line by line and reports,
+for the chosen time window: throughput, status codes, per-stage latency percentiles, which stages
+dominate the latency tail, cache hit ratios, provider calls and fallbacks taken.
+Memory stays bounded by the number of stage values, not by whole events: only the --slowest
+requests are kept.
+
+Usage:
+    python scripts/request_log_report.py                      # last hour
+    python scripts/request_log_report.py --since 24h --source analyze --category Movie
+    python scripts/request_log_report.py --since 2026-10-18T09:00 --until 2026-10-18T12:00 --slowest 20
+"""
+import argparse
+import gzip
+import heapq
+import json
+import re
+import sys
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.core.config import settings  # noqa: E402
+
+PERCENTILES = (50, 90, 95, 99)
+_DURATION_RE = re.compile(r"^(\d+(?:\.\d+)?)([smhd])$")
+_UNIT_SECONDS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_time(value: str | None, now: float) -> float | None:
+    """Accepts a relative duration ('30m', '6h', '2d'), an ISO timestamp or a unix timestamp."""
+    if value is None:
+        return None
+    match = _DURATION_RE.match(value)
+    if match:
+        return now - float(match.group(1)) * _UNIT_SECONDS[match.group(2)]
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+def iter_events(log_dir: Path, since: float | None, until: float | None):
+    """Yields events in the window, one line at a time (archives rotated before 'since' are skipped unread)."""
+    for path in sorted(log_dir.glob("requests-*.jsonl*")):
+        if since is not None and path.stat().st_mtime < since:
+            continue  # Every event in the file was written before its last modification
+        opener = gzip.open if path.suffix == ".gz" else open
+        with opener(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    continue  # Partially written last line of an active file
+                ts = event.get("ts", 0)
+                if (since is None or ts >= since) and (until is None or ts <= until):
+                    yield event
+
+
+def percentile(sorted_values: list[float], p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * p / 100
+    low = int(k)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (k - low)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dir", default=settings.REQUEST_LOG_DIR, help="Request log directory")
+    parser.add_argument("--since", default="1h", help="Window start: 30m, 6h, 2d, ISO time or unix time ('all' for everything)")
+    parser.add_argument("--until", default=None, help="Window end (same formats; default: now)")
+    parser.add_argument("--source", choices=["analyze", "job"], help="Only events from /analyze or from the job queue")
+    parser.add_argument("--category", help="Only one content category (Movie, Series, Music, Book)")
+    parser.add_argument("--slowest", type=int, default=10, help="How many of the slowest requests to list")
+    args = parser.parse_args()
+
+    now = time.time()
+    since = None if args.since == "all" else parse_time(args.since, now)
+    until = parse_time(args.until, now)
+
+    stage_values = defaultdict(list)
+    statuses, sources, kinds, levels, fallbacks = Counter(), Counter(), Counter(), Counter(), Counter()
+    cache_hits, cache_misses = Counter(), Counter()
+    provider_calls, provider_errors, provider_ms = Counter(), Counter(), Counter()
+    attempts = Counter()
+    slowest = []  # Min-heap of the --slowest requests: (total_ms, ts, id, stages)
+    first_ts, last_ts, count = None, None, 0
+
+    for event in iter_events(Path(args.dir), since, until):
+        if args.source and event.get("source") != args.source:
+            continue
+        if args.category and event.get("category") != args.category:
+            continue
+        count += 1
+        ts = event["ts"]
+        first_ts = ts if first_ts is None else min(first_ts, ts)
+        last_ts = ts if last_ts is None else max(last_ts, ts)
+
+        statuses[event.get("status")] += 1
+        sources[event.get("source")] += 1
+        kinds[event.get("kind")] += 1
+        levels[event.get("degradation_level", 0)] += 1
+        attempts[event.get("gemini_attempts", 0)] += 1
+        fallbacks.update(event.get("fallbacks", []))
+        for name, (hits, misses) in event.get("cache", {}).items():
+            cache_hits[name] += hits
+            cache_misses[name] += misses
+        for name, entry in event.get("providers", {}).items():
+            provider_calls[name] += entry["calls"]
+            provider_errors[name] += entry["errors"]
+            provider_ms[name] += entry["ms"]
+
+        stages = event.get("stages_ms", {})
+        for name, ms in stages.items():
+            stage_values[name].append(ms)
+        entry = (stages.get("total", 0.0), ts, event.get("id") or "", stages)
+        if len(slowest) < args.slowest:
+            heapq.heappush(slowest, entry)
+        elif args.slowest > 0 and entry[:3] > slowest[0][:3]:
+            heapq.heapreplace(slowest, entry)
+
+    if not count:
+        print(f"No request events in {args.dir} for this window.")
+        return
+
+    span = max(last_ts - first_ts, 1.0)
+    print(f"Window: {datetime.fromtimestamp(first_ts):%Y-%m-%d %H:%M:%S} -> "
+          f"{datetime.fromtimestamp(last_ts):%Y-%m-%d %H:%M:%S} ({span / 60:.1f} min)")
+    print(f"Requests: {count}  |  throughput {count / span:.3f} req/s ({count * 60 / span:.1f} req/min)")
+    print(f"Status: {dict(statuses)}  |  source: {dict(sources)}  |  kind: {dict(kinds)}")
+    print(f"Degradation levels: {dict(sorted(levels.items()))}  |  Gemini attempts: {dict(sorted(attempts.items()))}")
+
+    # --- Stage percentiles ---
+    print(f"\n{'Stage':<18} {'n':>6} " + " ".join(f"{'p' + str(p):>9}" for p in PERCENTILES) + f" {'max':>9}")
+    for name in sorted(stage_values, key=lambda n: (n == "total", n)):
+        values = sorted(stage_values[name])
+        stage_values[name] = values
+        row = " ".join(f"{percentile(values, p):>9.1f}" for p in PERCENTILES)
+        print(f"{name:<18} {len(values):>6} {row} {values[-1]:>9.1f}")
+    print("(milliseconds)")
+
+    # --- Tail attribution: each leaf stage's p90 against the p90 of the total ---
+    # 'recommendations' contains 'gemini' and 'enrichment_wait'; attribute to the leaf stages
+    total_p90 = percentile(stage_values.get("total", []), 90)
+    leaves = {name: percentile(values, 90) for name, values in stage_values.items()
+              if name not in ("total", "recommendations")}
+    if leaves and total_p90 > 0:
+        print(f"\nTail (p90) by stage, total p90 {total_p90:.1f} ms: "
+              + ", ".join(f"{name} {ms:.0f} ms ({ms / total_p90:.0%})"
+                          for name, ms in sorted(leaves.items(), key=lambda kv: -kv[1])))
+
+    slowest.sort(reverse=True)
+    print(f"\nSlowest {len(slowest)} request(s):")
+    for total_ms, ts, request_id, stages in slowest:
+        parts = ", ".join(f"{k}={v:.0f}" for k, v in stages.items() if k != "total")
+        print(f"  {total_ms:>9.1f} ms  {datetime.fromtimestamp(ts):%H:%M:%S}  {request_id}  {parts}")
+
+    # --- Caches, providers, fallbacks ---
+    if cache_hits or cache_misses:
+        print("\nCache hit ratio:")
+        for name in sorted(set(cache_hits) | set(cache_misses)):
+            total = cache_hits[name] + cache_misses[name]
+            print(f"  {name:<16} {cache_hits[name] / total:>6.1%}  ({cache_hits[name]}/{total})")
+    if provider_calls:
+        print("\nProvider calls:")
+        for name, calls in provider_calls.most_common():
+            print(f"  {name:<16} {calls:>6} calls  {provider_errors[name]:>4} errors  "
+                  f"avg {provider_ms[name] / calls:>7.1f} ms")
+    if fallbacks:
+        print("\nFallbacks taken: " + ", ".join(f"{name} {n}" for name, n in fallbacks.most_common()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+Standalone job worker process for the /jobs queue.
+
+Runs queued analyses from the shared SQLite queue (JOB_DB_PATH) without serving HTTP, so job
+capacity can be scaled separately from the API tier. Start the API with JOB_WORKERS=0 to leave
+all jobs to these processes, or keep a few in-process workers and add these for bursts.
+
+Usage:
+    JOB_WORKERS=0 uvicorn main:app
+    python scripts/run_job_workers.py --workers 4
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.core.config import settings, apply_thread_budget  # noqa: E402
+from app.core.models import preload_model_weights, warm_up_inference  # noqa: E402
+from app.services.job_queue import JobWorkerPool, job_queue  # noqa: E402
+from app.services.request_log import request_log_writer  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=max(settings.JOB_WORKERS, 1), help="Job threads")
+    args = parser.parse_args()
+
+    apply_thread_budget()
+    preload_model_weights()
+    warm_up_inference()
+
+    pool = JobWorkerPool(job_queue, args.workers)
+    pool.start()
+    try:
+        while True:
+            time.sleep(30)
+            print(f" Job workers: {pool.stats()}")
+    except KeyboardInterrupt:
+        print(" Stopping job workers...")
+        pool.stop()
+        request_log_writer.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""
+Per-process memory report for a running gunicorn master and its workers.
+Shows how much of each worker's RSS is shared with the master (copy-on-write model weights)
+and how much is private to the worker.
+
+Usage:
+    gunicorn main:app -c gunicorn.conf.py &
+    python scripts/worker_memory_report.py --pid <master pid>
+"""
+import argparse
+
+import psutil
+
+
+def mb(value: int) -> str:
+    return f"{value / (1024 * 1024):8.1f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pid", type=int, required=True, help="PID of the gunicorn master")
+    args = parser.parse_args()
+
+    master = psutil.Process(args.pid)
+    processes = [("master", master)] + [("worker", child) for child in master.children()]
+
+    print(f"{'Role':<8} {'PID':>7} {'RSS MB':>8} {'PSS MB':>8} {'Shared MB':>9} {'Private MB':>10}")
+    total_rss = total_pss = 0
+    for role, proc in processes:
+        info = proc.memory_full_info()  # Linux: reads /proc/<pid>/smaps
+        shared = info.shared
+        private = info.uss
+        total_rss += info.rss
+        total_pss += info.pss
+        print(f"{role:<8} {proc.pid:>7} {mb(info.rss)} {mb(info.pss)} {mb(shared):>9} {mb(private):>10}")
+
+    print(f"\nSum of RSS: {mb(total_rss).strip()} MB (what per-worker model copies would cost)")
+    print(f"Sum of PSS: {mb(total_pss).strip()} MB (actual footprint with shared pages counted once)")
+
+
+if __name__ == "__main__":
+    main()